@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""Startup time of `import markdownusm.cli` measured by `python -X importtime`
+
+Exits with status 1 when the median import time exceeds the budget or when
+heavy modules are imported eagerly.
+
+Usage:
+    poetry run python benchmarks/bench_import.py [budget_ms]
+
+"""
+
+import statistics
+import subprocess
+import sys
+
+MODULE = "markdownusm.cli"
+
+# Modules which must be imported only on first conversion
+DEFERRED = ["pydantic", "jinja2", "argparse"]
+
+# Imported beforehand since almost every host process has imported them
+PRELOADED = ["typing"]
+
+REPEAT = 7
+
+
+def import_time() -> tuple[float, set[str]]:
+    """Cumulative import time of MODULE in milliseconds and imported modules"""
+    statement = f"import {', '.join(PRELOADED + [MODULE])}"
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative = 0.0
+    modules = set()
+    for line in process.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        _, cumulative_us, name = line.split("|")
+        modules.add(name.strip())
+        if name.strip() == MODULE:
+            cumulative = int(cumulative_us) / 1000
+
+    return cumulative, modules
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    results = [import_time() for _ in range(REPEAT)]
+    median = statistics.median(x for x, _ in results)
+    eager = [x for x in DEFERRED if x in results[0][1]]
+
+    print(f"import {MODULE}: {median:.2f} ms (budget {budget:.2f} ms)")
+    if eager:
+        print(f"imported eagerly: {', '.join(eager)}")
+
+    if median > budget or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Compare memory of stories as dictionaries and as a `StoryTable`
+
+Both are built from the same `MarkdownParser`, so only memory of the story
+positions is measured: the peak while building them and the bytes kept
+afterwards.
+
+Usage:
+    poetry run python benchmarks/bench_memory.py [--stories N]
+
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from synthetic import MapShape, generate
+
+from markdownusm.parser import MarkdownParser
+
+
+def measure(build: Callable[[], Any]) -> dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return dict(seconds=seconds, retained_bytes=retained, peak_bytes=peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stories", type=int, default=100_000)
+    args = parser.parse_args()
+
+    # 10 stories in each of 10 releases of a task on average
+    shape = MapShape(
+        activities=max(1, args.stories // 1000), tasks=10, releases=10, stories=10
+    )
+    markdown_parser = MarkdownParser(markdown=generate(shape))
+    stories = len(markdown_parser.story_table())
+
+    results = {
+        "dicts": measure(markdown_parser.extract_stories_with_position),
+        "table": measure(markdown_parser.story_table),
+    }
+
+    print(f"{stories:,} stories")
+    print(f"{'storage':<7} {'ms':>8} {'peak MiB':>9} {'kept MiB':>9} {'B/story':>8}")
+
+    for name, result in results.items():
+        print(
+            f"{name:<7} {result['seconds'] * 1000:>8.1f} "
+            f"{result['peak_bytes'] / 2 ** 20:>9.2f} "
+            f"{result['retained_bytes'] / 2 ** 20:>9.2f} "
+            f"{result['retained_bytes'] / stories:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""Speedup of the parallel layout over the serial conversion
+
+Usage:
+    poetry run python benchmarks/bench_parallel.py [-j JOBS ...] [--stories N]
+
+"""
+
+import argparse
+import os
+import time
+
+from synthetic import MapShape, generate
+
+from markdownusm.converter import Converter
+from markdownusm.parallel import convert_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-j", "--jobs", type=int, action="append", help="CPU count by default"
+    )
+    parser.add_argument("--stories", type=int, default=100_000)
+    args = parser.parse_args()
+
+    shape = MapShape(
+        activities=max(1, args.stories // 1000), tasks=10, releases=10, stories=10
+    )
+    markdown = generate(shape)
+    converter = Converter()
+
+    start = time.perf_counter()
+    expected = converter.convert(markdown)
+    serial = time.perf_counter() - start
+    print(f"{'serial':>8}: {serial:8.3f} s")
+
+    for jobs in args.jobs or [os.cpu_count() or 1]:
+        start = time.perf_counter()
+        actual = convert_parallel(markdown, converter, jobs=jobs)
+        seconds = time.perf_counter() - start
+
+        assert actual == expected, f"output of {jobs} jobs differs"
+        print(f"{jobs:>8}: {seconds:8.3f} s  x{serial / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
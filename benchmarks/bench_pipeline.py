@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""Time each stage of the conversion on synthetic story maps
+
+Stages:
+    parse: `MarkdownParser`, its extractors and the story table
+    layout: `Usm` creating shapes with absolute positions
+    to_xml: `to_xml` of every shape
+    render: `XMLObjects` rendering the document
+
+Results are written as JSON, and a previous result can be compared with
+the current one.
+
+Usage:
+    poetry run python benchmarks/bench_pipeline.py [-p PRESET ...] [-o FILE] [-c FILE]
+
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from synthetic import PRESETS, MapShape, generate
+
+from markdownusm.converter import Converter, Sources
+from markdownusm.parser import MarkdownParser
+from markdownusm.xml import XMLObjects
+
+
+def stages(markdown: str) -> list[tuple[str, Callable[[Any], Any]]]:
+    """Stages in order, each taking the output of the previous one"""
+    converter = Converter()
+
+    def parse(markdown: str) -> Sources:
+        return Sources.from_parser(MarkdownParser(markdown=markdown))
+
+    def layout(sources: Sources) -> list:
+        usm = converter.usm
+        return [
+            *usm(sources.activities).iter_activities(),
+            *usm(sources.tasks).iter_tasks(),
+            *usm([]).iter_story_table(sources.stories),
+            *usm(sources.release_texts).iter_release_texts(),
+            *usm(sources.release_bars).iter_release_bars(),
+        ]
+
+    def to_xml(shapes: list) -> list[str]:
+        return [x.to_xml() for x in shapes]
+
+    def render(cells: list[str]) -> str:
+        return "".join(XMLObjects().generate_xml(cells))
+
+    return [
+        ("parse", parse),
+        ("layout", layout),
+        ("to_xml", to_xml),
+        ("render", render),
+    ]
+
+
+def measure(shape: MapShape, repeat: int) -> dict[str, Any]:
+    markdown = generate(shape)
+    result: dict[str, Any] = dict(shape=shape.asdict(), lines=markdown.count("\n") + 1)
+    timings: dict[str, dict[str, float]] = {}
+
+    value: Any = markdown
+    for name, func in stages(markdown):
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = func(value)
+            seconds.append(time.perf_counter() - start)
+
+        # Peak memory is measured separately since tracemalloc slows down
+        tracemalloc.start()
+        func(value)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings[name] = dict(seconds=min(seconds), peak_bytes=peak)
+        value = output
+
+        if name == "layout":
+            result["cards"] = len(output)
+
+    for timing in timings.values():
+        timing["cards_per_second"] = result["cards"] / timing["seconds"]
+
+    total = sum(x["seconds"] for x in timings.values())
+    timings["total"] = dict(
+        seconds=total,
+        peak_bytes=max(x["peak_bytes"] for x in timings.values()),
+        cards_per_second=result["cards"] / total,
+    )
+    result["stages"] = timings
+
+    return result
+
+
+def commit() -> Optional[str]:
+    try:
+        process = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return process.stdout.strip()
+
+
+def report(results: dict[str, Any], previous: Optional[dict[str, Any]]) -> None:
+    print(f"{'case':<8} {'stage':<7} {'cards/s':>12} {'ms':>10} {'peak MiB':>9}")
+
+    for case, result in results["cases"].items():
+        for stage, timing in result["stages"].items():
+            line = (
+                f"{case:<8} {stage:<7} {timing['cards_per_second']:>12,.0f} "
+                f"{timing['seconds'] * 1000:>10.2f} "
+                f"{timing['peak_bytes'] / 2 ** 20:>9.2f}"
+            )
+
+            try:
+                before = previous["cases"][case]["stages"][stage]  # type: ignore
+            except (KeyError, TypeError):
+                pass
+            else:
+                line += f"  x{before['seconds'] / timing['seconds']:.2f} speed"
+
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-p", "--preset", action="append", choices=PRESETS, help="All by default"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", type=Path, help="JSON file to write")
+    parser.add_argument("-c", "--compare", type=Path, help="JSON file to compare")
+    args = parser.parse_args()
+
+    previous = json.loads(args.compare.read_text()) if args.compare else None
+    results = dict(
+        commit=commit(),
+        python=platform.python_version(),
+        cases={x: measure(PRESETS[x], args.repeat) for x in args.preset or PRESETS},
+    )
+
+    report(results, previous)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""Per-render cost of the XML template with and without the compile cache
+
+Usage:
+    poetry run python benchmarks/bench_template.py [number]
+
+"""
+
+import sys
+import timeit
+
+from jinja2 import BaseLoader, Environment
+
+from markdownusm.xml import Rectangle, XMLObjects
+
+shapes = [Rectangle(text="Story", x=0, y=0, fillColor="", fontColor="")]
+objects = XMLObjects(shapes=shapes)
+
+
+def render_uncached() -> str:
+    """Render as before the cache, compiling the template every time"""
+    template = Environment(loader=BaseLoader()).from_string(objects.xml_template)
+
+    return template.render(shapes=[x.to_xml() for x in objects.shapes])
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    assert render_uncached() == objects.render()
+
+    for name, func in [("uncached", render_uncached), ("cached", objects.render)]:
+        seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+        print(f"{name:>10}: {seconds * 1e6:10.1f} us/render")
+
+
+if __name__ == "__main__":
+    main()
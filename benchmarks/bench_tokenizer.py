@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Per-line cost of classifying markdown lines
+
+Compares the first-character dispatch of `classify` with the chained
+`startswith` and `replace` calls it replaced, and with a regex alternation.
+
+Usage:
+    poetry run python benchmarks/bench_tokenizer.py [-p PRESET]
+
+"""
+
+import argparse
+import re
+import timeit
+
+from synthetic import PRESETS, generate
+
+from markdownusm.reader import markdown_lines
+from markdownusm.tokenizer import LineKind, classify
+
+PATTERN = re.compile(r"(## )|(# )|(- )|(---)")
+KINDS = {
+    1: (LineKind.TASK, 3),
+    2: (LineKind.ACTIVITY, 2),
+    3: (LineKind.RELEASE, 2),
+    4: (LineKind.SEPARATOR, 0),
+}
+
+
+def chained(lines: list[str]) -> list[tuple[LineKind, str]]:
+    """Classify as before the tokenizer"""
+    result = []
+
+    for line in lines:
+        if line.startswith("## "):
+            result.append((LineKind.TASK, line.replace("## ", "")))
+        elif line.startswith("# "):
+            result.append((LineKind.ACTIVITY, line.replace("# ", "")))
+        elif line.startswith("- "):
+            result.append((LineKind.RELEASE, line.replace("- ", "")))
+        elif line.startswith("---"):
+            result.append((LineKind.SEPARATOR, line))
+        else:
+            result.append((LineKind.STORY, line))
+
+    return result
+
+
+def regex(lines: list[str]) -> list[tuple[LineKind, str]]:
+    result = []
+
+    for line in lines:
+        match = PATTERN.match(line)
+        kind, offset = KINDS[match.lastindex] if match else (LineKind.STORY, 0)
+        result.append((kind, line[offset:]))
+
+    return result
+
+
+def dispatch(lines: list[str]) -> list[tuple[LineKind, str]]:
+    result = []
+
+    for line in lines:
+        kind, offset = classify(line)
+        result.append((kind, line[offset:]))
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-p", "--preset", choices=PRESETS, default="large")
+    args = parser.parse_args()
+
+    lines = list(markdown_lines([generate(PRESETS[args.preset])]))
+
+    assert chained(lines) == regex(lines) == dispatch(lines)
+
+    for name, func in [("chained", chained), ("regex", regex), ("dispatch", dispatch)]:
+        seconds = min(timeit.repeat(lambda: func(lines), number=1, repeat=5))
+        print(f"{name:>10}: {seconds / len(lines) * 1e9:8.1f} ns/line")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""Synthetic story maps for benchmarks"""
+
+import random
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class MapShape:
+    """Size of a synthetic story map
+
+    Stories in a cell, a pair of task and release, are `stories` on average.
+    With `skew` above 0 they follow a power law over tasks, so that a few
+    columns are much taller than the others.
+
+    """
+
+    activities: int
+    tasks: int
+    releases: int
+    stories: int
+    skew: float = 0.0
+    seed: int = 0
+
+    def asdict(self) -> dict:
+        return asdict(self)
+
+
+PRESETS = {
+    "small": MapShape(activities=3, tasks=3, releases=3, stories=3),
+    "wide": MapShape(activities=100, tasks=10, releases=3, stories=2),
+    "tall": MapShape(activities=2, tasks=5, releases=10, stories=100),
+    "skewed": MapShape(activities=20, tasks=5, releases=5, stories=20, skew=1.2),
+    "large": MapShape(activities=50, tasks=10, releases=10, stories=10),
+}
+
+
+def generate(shape: MapShape) -> str:
+    """Create markdown of a story map
+
+    Some stories are warnings (`!`) or have their own colors (`#hex`) to
+    cover every story style
+
+    """
+    rng = random.Random(shape.seed)
+    columns = shape.activities * shape.tasks
+
+    # Relative weight of each column
+    weights = [1 / (i + 1) ** shape.skew for i in range(columns)]
+    scale = shape.stories * columns / sum(weights)
+
+    lines = [f"- Release {r}" for r in range(shape.releases)]
+    lines.append("")
+
+    for a in range(shape.activities):
+        lines.append(f"# Activity {a}")
+
+        for t in range(shape.tasks):
+            column = a * shape.tasks + t
+            lines.append(f"## Task {column}")
+
+            for r in range(shape.releases):
+                if r > 0:
+                    lines.append("---")
+
+                mean = weights[column] * scale
+                for s in range(max(0, round(rng.gauss(mean, mean / 4)))):
+                    lines.append(_story(rng, f"Story {column}-{r}-{s}"))
+
+            lines.append("")
+
+    return "\n".join(lines)
+
+
+def _story(rng: random.Random, text: str) -> str:
+    dice = rng.random()
+
+    if dice < 0.05:
+        return f"{text}!"
+    if dice < 0.1:
+        return f"{text} #{rng.randrange(0x1000000):06x}"
+
+    return text
@@ -0,0 +1,13 @@
+"""Draw user story mapping diagrams from markdown"""
+
+from typing import Any
+
+
+def __getattr__(name: str) -> Any:
+    # Imported on first access to keep `import markdownusm.cli` cheap
+    if name == "Converter":
+        from markdownusm.converter import Converter
+
+        return Converter
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+"""Convert many markdown files in parallel"""
+
+import glob
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, TextIO
+
+SUFFIX = ".dio"
+
+
+@dataclass
+class Source:
+    """Markdown file to convert"""
+
+    path: Path
+    # Path of the output relative to an output directory
+    relative: Path
+
+
+@dataclass
+class Result:
+    """Outcome of converting one file"""
+
+    source: Path
+    destination: Path
+    error: Optional[str] = None
+    # Profile of each stage when requested
+    records: list[dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def collect(patterns: Iterable[str]) -> list[Source]:
+    """Find markdown files from file paths, directories and glob patterns
+
+    Directories are searched recursively for `*.md` files whose paths
+    relative to the directory are kept for the outputs. Matches of glob
+    patterns keep their paths relative to the directory before the first
+    wildcard.
+
+    Examples:
+        >>> collect(["maps", "extra/**/*.md"])
+        [Source(path=Path("maps/a/b.md"), relative=Path("a/b.md")),
+         Source(path=Path("extra/c/d.md"), relative=Path("c/d.md")), ...]
+
+    """
+    result: dict[Path, Source] = {}
+
+    for pattern in patterns:
+        path = Path(pattern)
+
+        if path.is_dir():
+            paths = sorted(x for x in path.rglob("*.md") if x.is_file())
+            sources = [Source(x, x.relative_to(path)) for x in paths]
+        elif path.exists():
+            sources = [Source(path, Path(path.name))]
+        else:
+            base = glob_base(pattern)
+            matches = map(Path, sorted(glob.glob(pattern, recursive=True)))
+            sources = [Source(x, x.relative_to(base)) for x in matches if x.is_file()]
+
+        for source in sources:
+            result.setdefault(source.path, source)
+
+    return list(result.values())
+
+
+def glob_base(pattern: str) -> Path:
+    """Directory of a glob pattern before its first wildcard
+
+    Examples:
+        >>> glob_base("backlog/**/*.md")
+        Path("backlog")
+
+    """
+    parts = Path(pattern).parts
+    stop = next(
+        (i for i, x in enumerate(parts) if any(c in x for c in "*?[")), len(parts)
+    )
+
+    return Path(*parts[:stop])
+
+
+def destination(source: Source, output_dir: Optional[Path] = None) -> Path:
+    """Output path next to the source or in the output directory"""
+    if output_dir is None:
+        return source.path.with_suffix(SUFFIX)
+
+    return output_dir / source.relative.with_suffix(SUFFIX)
+
+
+def convert_file(
+    source: Path,
+    destination: Path,
+    cache_dir: Optional[Path] = None,
+    profile: bool = False,
+    minify: bool = False,
+    compress: bool = False,
+) -> Result:
+    """Convert one markdown file, reporting errors instead of raising them
+
+    Args:
+        cache_dir: Directory of `OutputCache`, not cached when it is None
+        profile: Record timing and counters of each stage in the result
+        minify: Drop whitespace between tags
+        compress: Compress the diagram by deflate and base64
+
+    """
+    from markdownusm.cache import open_atomic
+    from markdownusm.cli import convert_path
+    from markdownusm.instrument import Profiler
+
+    profiler = Profiler(source=str(source)) if profile else None
+
+    try:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+
+        # A failed conversion leaves the previous output as it was
+        with open_atomic(destination) as fp:
+            convert_path(
+                source,
+                fp,
+                cache_dir=cache_dir,
+                profiler=profiler,
+                minify=minify,
+                compress=compress,
+            )
+    except Exception as e:
+        return Result(source, destination, error=f"{type(e).__name__}: {e}")
+
+    return Result(source, destination, records=profiler.records if profiler else [])
+
+
+def convert_files(
+    sources: list[Source],
+    output_dir: Optional[Path] = None,
+    jobs: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+    profile: bool = False,
+    minify: bool = False,
+    compress: bool = False,
+) -> Iterator[Result]:
+    """Convert markdown files over a process pool
+
+    Results are yielded in the order of `sources`. With `jobs=1` files are
+    converted in this process. Sources sharing a destination are not
+    converted and fail, so that none of them overwrites another.
+
+    """
+    destinations = [destination(x, output_dir) for x in sources]
+    counts = Counter(x.resolve() for x in destinations)
+    unique = [counts[x.resolve()] == 1 for x in destinations]
+
+    paths = [x.path for x, ok in zip(sources, unique) if ok]
+    targets = [x for x, ok in zip(destinations, unique) if ok]
+    cache_dirs = repeat(cache_dir, len(paths))
+    profiles = repeat(profile, len(paths))
+    minifies = repeat(minify, len(paths))
+    compresses = repeat(compress, len(paths))
+    arguments = [paths, targets, cache_dirs, profiles, minifies, compresses]
+
+    def results(converted: Iterator[Result]) -> Iterator[Result]:
+        for source, target, ok in zip(sources, destinations, unique):
+            if ok:
+                yield next(converted)
+            else:
+                error = "Destination is shared with another input"
+                yield Result(source.path, target, error=error)
+
+    if jobs == 1:
+        yield from results(map(convert_file, *arguments))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from results(executor.map(convert_file, *arguments))
+
+
+def page_name(source: Source) -> str:
+    """Name of the page of a source in a merged document
+
+    Examples:
+        >>> page_name(Source(Path("maps/a/b.md"), Path("a/b.md")))
+        'a/b'
+
+    """
+    return source.relative.with_suffix("").as_posix()
+
+
+def render_page(
+    source: Path, name: str, minify: bool = False, compress: bool = False
+) -> str:
+    """Convert one markdown file into a `<diagram>` page"""
+    from markdownusm.cli import page
+
+    markdown = source.read_text(encoding=sys.getdefaultencoding(), errors="ignore")
+
+    return page(markdown, name, minify=minify, compress=compress)
+
+
+def merge_files(
+    sources: list[Source],
+    fp: TextIO,
+    jobs: Optional[int] = None,
+    minify: bool = False,
+    compress: bool = False,
+) -> None:
+    """Write one document with a page for each markdown file
+
+    Pages are rendered over a process pool and written in the order of
+    `sources` as soon as each of them is ready. With `jobs=1` pages are
+    rendered in this process.
+
+    """
+    from markdownusm.xml import XMLObjects
+
+    paths = [x.path for x in sources]
+    names = [page_name(x) for x in sources]
+    arguments = [
+        paths,
+        names,
+        repeat(minify, len(sources)),
+        repeat(compress, len(sources)),
+    ]
+    xml_objects = XMLObjects(minify=minify, compress=compress)
+
+    if jobs == 1:
+        fp.writelines(xml_objects.generate_pages(map(render_page, *arguments)))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pages = executor.map(render_page, *arguments)
+        fp.writelines(xml_objects.generate_pages(pages))
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+"""On-disk cache of converted XML documents"""
+
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import IO, Callable, Iterable, Iterator, Optional, TextIO, Union, cast
+
+U = Union[str, float]
+
+# 256 MiB
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+SUFFIX = ".xml"
+
+# XML documents are about 28 times as large as their markdown
+OUTPUT_RATIO = 32
+
+
+def default_directory() -> Path:
+    """Cache directory following XDG base directory specification"""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+
+    return Path(base) / "markdownusm"
+
+
+def package_version() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("markdownusm")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def usm_settings() -> dict[str, U]:
+    """Default layout and color settings of `Usm` used by `cli.parse`"""
+    from markdownusm.usm import UsmSettings
+
+    return UsmSettings().dict()
+
+
+@contextmanager
+def open_atomic(path: Path) -> Iterator[TextIO]:
+    """Write a file replacing `path` at once when the block succeeds
+
+    Readers never see the file half written, and `path` is left as it was
+    when the block raises
+
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            yield fp
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """Replace a file at once so that readers never see it half written"""
+    with open_atomic(path) as fp:
+        fp.write(text)
+
+
+class _Tee:
+    """Text file writing to another one and a copy in UTF-8 up to `limit` bytes
+
+    The copy is no longer written once it would exceed `limit`.
+
+    """
+
+    def __init__(self, fp: TextIO, copy: IO[bytes], limit: int):
+        self.fp = fp
+        self.copy = copy
+        self.limit = limit
+        self.size = 0
+
+    @property
+    def full(self) -> bool:
+        return self.size > self.limit
+
+    def write(self, text: str) -> int:
+        if not self.full:
+            data = text.encode("utf-8", errors="surrogatepass")
+            self.size += len(data)
+            if not self.full:
+                self.copy.write(data)
+
+        return self.fp.write(text)
+
+    def writelines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.write(line)
+
+
+class OutputCache:
+    """XML documents keyed by a hash of markdown, settings and package version
+
+    Least recently used documents are evicted when the total size exceeds
+    `max_bytes`, and documents larger than that are not stored. Documents
+    are written atomically, so the cache can be shared by several processes.
+
+    """
+
+    def __init__(
+        self, directory: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.directory = default_directory() if directory is None else directory
+        self.max_bytes = max_bytes
+
+    @property
+    def max_source_bytes(self) -> int:
+        """Size of the largest markdown worth caching
+
+        Its XML takes up to a quarter of the cache, so that one document does
+        not push most of the others out.
+
+        """
+        return self.max_bytes // (OUTPUT_RATIO * 4)
+
+    def key(self, markdown: str, settings: dict[str, U]) -> str:
+        """Hash of everything the XML document depends on"""
+        digest = hashlib.sha256()
+        digest.update(package_version().encode())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        digest.update(markdown.encode("utf-8", errors="surrogatepass"))
+
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+
+        try:
+            xml = path.read_text(encoding="utf-8")
+            # Access time is tracked by modification time for LRU eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return xml
+
+    def set(self, key: str, xml: str) -> None:
+        if len(xml) > self.max_bytes:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_atomic(self._path(key), xml)
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used documents beyond `max_bytes`"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def wrap(
+        self, func: Callable[[str], str], settings: Optional[dict[str, U]] = None
+    ) -> Callable[[str], str]:
+        """Cache a function converting markdown into XML
+
+        Examples:
+            >>> parse = OutputCache().wrap(cli.parse)
+            >>> parse("# Activity\\n## Task\\nStory")
+
+        """
+        key_settings = usm_settings() if settings is None else settings
+
+        @wraps(func)
+        def wrapper(markdown: str) -> str:
+            key = self.key(markdown, key_settings)
+
+            if (xml := self.get(key)) is not None:
+                return xml
+
+            xml = func(markdown)
+            self.set(key, xml)
+
+            return xml
+
+        return wrapper
+
+    def stream(
+        self,
+        func: Callable[[str, TextIO], None],
+        settings: Optional[dict[str, U]] = None,
+    ) -> Callable[[str, TextIO], None]:
+        """Cache a function writing XML converted from markdown to a file
+
+        XML is written to the file while it is generated and to the cache at
+        the same time, unless it grows larger than `max_bytes`.
+
+        Examples:
+            >>> write = OutputCache().stream(cli.write)
+            >>> write("# Activity\\n## Task\\nStory", sys.stdout)
+
+        """
+        key_settings = usm_settings() if settings is None else settings
+
+        @wraps(func)
+        def wrapper(markdown: str, fp: TextIO) -> None:
+            key = self.key(markdown, key_settings)
+
+            if (xml := self.get(key)) is not None:
+                fp.write(xml)
+                return
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as copy:
+                    tee = _Tee(fp, copy, self.max_bytes)
+                    func(markdown, cast(TextIO, tee))
+                if tee.full:
+                    os.unlink(tmp)
+                else:
+                    os.replace(tmp, self._path(key))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+            if not tee.full:
+                self.evict()
+
+        return wrapper
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{SUFFIX}"
@@ -1,57 +1,540 @@
 #!/usr/bin/env python
+"""Command line interface
+
+Importing this module is cheap and has no side effects. Arguments are
+parsed in `main`, and pydantic and jinja2 are imported on first conversion.
+
+"""
+
+from __future__ import annotations
 
-import argparse
 import sys
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Optional, TextIO
 
-from markdownusm.parser import MarkdownParser
-from markdownusm.usm import Usm
-from markdownusm.xml import XMLObjects
+if TYPE_CHECKING:
+    import argparse
+    from pathlib import Path
 
-parser = argparse.ArgumentParser()
-parser.add_argument(
-    "file",
-    type=argparse.FileType("r", encoding=sys.getdefaultencoding(), errors="ignore"),
-)
-parser.add_argument("-o", required=False, type=argparse.FileType("w", encoding="utf-8"))
-args = parser.parse_args()
+    from markdownusm.converter import Converter
+    from markdownusm.instrument import Profiler, Record
 
 
 def main():
-    xml = parse(args.file.read())
+    if sys.argv[1:2] == ["serve"]:
+        _serve(sys.argv[2:])
+        return
 
-    if args.o is None:
-        print(xml)
+    parser = _argument_parser()
+    args = parser.parse_args()
+
+    if args.watch:
+        _watch(parser, args)
+        return
+
+    if args.reverse:
+        _reverse(parser, args)
+        return
+
+    if args.diff is not None:
+        _diff(parser, args)
+        return
+
+    single = args.merge is None and args.output_dir is None and len(args.files) == 1
+    if args.parallel and not single:
+        parser.error("--parallel can only be used with a single input file")
+
+    if args.merge is not None:
+        sys.exit(_merge(args.files, args.merge, args.jobs, args.minify, args.compress))
+
+    cache_dir = None
+    if not args.no_cache and args.profile is None:
+        from markdownusm.cache import default_directory
+
+        cache_dir = args.cache_dir or default_directory()
+
+    if args.profile is None:
+        _convert_inputs(parser, args, cache_dir)
+    elif args.profile == "-":
+        _convert_inputs(parser, args, cache_dir, sys.stderr)
+    else:
+        with open(args.profile, "w") as fp:
+            _convert_inputs(parser, args, cache_dir, fp)
+
+
+def parse(
+    markdown: str,
+    profiler: Optional[Profiler] = None,
+    minify: bool = False,
+    compress: bool = False,
+) -> str:
+    """Convert markdown into XML
+
+    Args:
+        profiler: Measures each stage when given
+        minify: Drop whitespace between tags
+        compress: Compress the diagram the way draw.io saves it
+
+    """
+    return _converter(minify, compress).convert(markdown, profiler=profiler)
+
+
+def page(markdown: str, name: str, minify: bool = False, compress: bool = False) -> str:
+    """Convert markdown into a `<diagram>` page of a document with many pages"""
+    return _converter(minify, compress).convert_page(markdown, name)
+
+
+def write(
+    markdown: str, fp: TextIO, minify: bool = False, compress: bool = False
+) -> None:
+    """Write XML converted from markdown while shapes are being created"""
+    _converter(minify, compress).convert_to(markdown, fp)
+
+
+def convert(
+    markdown: str,
+    fp: TextIO,
+    cache_dir: Optional[Path] = None,
+    profiler: Optional[Profiler] = None,
+    minify: bool = False,
+    compress: bool = False,
+) -> None:
+    """Write XML converted from markdown, reusing cached XML in `cache_dir`
+
+    XML is streamed by `write`, and copied into the cache when `cache_dir`
+    is given. With `profiler` the cache is not used so that every stage runs.
+
+    """
+    if profiler is not None:
+        fp.write(parse(markdown, profiler, minify, compress))
+        return
+
+    if cache_dir is None:
+        write(markdown, fp, minify, compress)
+        return
+
+    from markdownusm.cache import OutputCache
+
+    cached = OutputCache(cache_dir).stream(
+        lambda x, y: write(x, y, minify, compress),
+        settings=_converter(minify, compress).dict(),
+    )
+    cached(markdown, fp)
+
+
+def convert_path(
+    path: Path,
+    fp: TextIO,
+    cache_dir: Optional[Path] = None,
+    profiler: Optional[Profiler] = None,
+    minify: bool = False,
+    compress: bool = False,
+) -> None:
+    """Write XML converted from a markdown file
+
+    The file is read chunk by chunk through a memory map unless the cache or
+    `profiler` needs the whole text. Files too large for the cache are
+    always read that way.
+
+    """
+    if profiler is None and cache_dir is not None:
+        from markdownusm.cache import OutputCache
+
+        if path.stat().st_size > OutputCache(cache_dir).max_source_bytes:
+            cache_dir = None
+
+    if profiler is None and cache_dir is None:
+        from markdownusm.reader import read_chunks
+
+        _converter(minify, compress).convert_chunks(read_chunks(path), fp)
         return
 
-    args.o.write(xml)
+    markdown = path.read_text(encoding=sys.getdefaultencoding(), errors="ignore")
+    convert(markdown, fp, cache_dir, profiler, minify, compress)
+
+
+def _argument_parser() -> argparse.ArgumentParser:
+    import argparse
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "files",
+        nargs="+",
+        metavar="file",
+        help="Markdown files, directories or glob patterns ('-' for stdin)",
+    )
+    parser.add_argument(
+        "-o",
+        required=False,
+        type=argparse.FileType("w", encoding="utf-8"),
+        help="Output file for a single input",
+    )
+    parser.add_argument(
+        "-d",
+        "--output-dir",
+        type=Path,
+        help="Directory for outputs of batch conversion, next to inputs by default",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of worker processes for batch conversion and --parallel, "
+        "CPU count by default",
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Lay out stories of a single huge input in worker processes. Output "
+        "cache is not used",
+    )
+    parser.add_argument(
+        "-m",
+        "--merge",
+        type=Path,
+        metavar="FILE",
+        help="Write one file with a page for each input instead",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Render a single input again whenever it changes, to -o or next to it",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="Seconds between polls in watch mode",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Directory of the output cache, ~/.cache/markdownusm by default",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Convert without reading or writing the output cache",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="Write timing and counters of each stage as JSON lines, to stderr by "
+        "default. Output cache is not used",
+    )
+    parser.add_argument(
+        "--reverse",
+        action="store_true",
+        help="Convert a single draw.io file, compressed or not, back into markdown",
+    )
+    parser.add_argument(
+        "--diff",
+        type=Path,
+        metavar="OLD",
+        help="Write only cells added, removed or changed since OLD, a draw.io file "
+        "converted from an earlier version of a single input",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="Drop whitespace between tags",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Compress the diagram by deflate and base64 as draw.io saves it",
+    )
 
+    return parser
 
-def parse(markdown: str) -> str:
-    parser = MarkdownParser(markdown=markdown)
 
-    activities_list = parser.extract_activities_with_position()
-    tasks_list = parser.extract_tasks_with_position()
-    stories_list = parser.extract_stories_with_position()
-    release_texts_list = parser.extract_release_texts_with_position()
-    release_bars_list = parser.create_release_bars_with_position()
+def _serve(argv: list[str]) -> None:
+    import argparse
+    import asyncio
 
-    usm_activities = Usm(source=activities_list)
-    usm_tasks = Usm(source=tasks_list)
-    usm_stories = Usm(source=stories_list)
-    usm_release_texts = Usm(source=release_texts_list)
-    usm_release_bars = Usm(source=release_bars_list)
+    from markdownusm.server import DEFAULT_MAX_BODY, ConversionServer
 
-    activities = usm_activities.to_activities()
-    tasks = usm_tasks.to_tasks()
-    stories = usm_stories.to_stories()
-    release_texts = usm_release_texts.to_release_texts()
-    release_bars = usm_release_bars.to_release_bars()
+    parser = argparse.ArgumentParser(
+        prog="musm serve", description="Convert markdown into XML over HTTP"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of worker processes, CPU count by default",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Maximum number of conversions at once, number of jobs by default",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        help="Number of recent results kept in memory",
+    )
+    parser.add_argument(
+        "--max-body",
+        type=int,
+        default=DEFAULT_MAX_BODY,
+        help="Maximum size of markdown in bytes",
+    )
+    args = parser.parse_args(argv)
 
-    export = XMLObjects(
-        shapes=activities + tasks + stories + release_texts + release_bars
+    server = ConversionServer(
+        host=args.host,
+        port=args.port,
+        jobs=args.jobs,
+        concurrency=args.concurrency,
+        cache_size=args.cache_size,
+        max_body=args.max_body,
     )
+    print(f"Serving on http://{args.host}:{args.port}/convert", file=sys.stderr)
+
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def _parallel(
+    source: str,
+    fp: TextIO,
+    jobs: Optional[int],
+    minify: bool = False,
+    compress: bool = False,
+) -> None:
+    """Write XML of a single input, stories rendered in worker processes"""
+    from pathlib import Path
+
+    from markdownusm.parallel import generate_parallel
+    from markdownusm.parser import MarkdownParser
+    from markdownusm.reader import markdown_lines, read_chunks, stream_chunks
+
+    chunks = stream_chunks(sys.stdin) if source == "-" else read_chunks(Path(source))
+    parser = MarkdownParser.from_lines(markdown_lines(chunks))
+
+    fp.writelines(generate_parallel(parser, _converter(minify, compress), jobs))
+
+
+def _convert_inputs(
+    parser: argparse.ArgumentParser,
+    args: argparse.Namespace,
+    cache_dir: Optional[Path],
+    profile_fp: Optional[TextIO] = None,
+) -> None:
+    """Convert a single input to -o or stdout, or many inputs into files
+
+    Args:
+        profile_fp: File to write profiles to as lines of JSON
+
+    """
+    from pathlib import Path
+
+    profile = None
+    if profile_fp is not None:
+        from markdownusm.instrument import json_lines
+
+        profile = json_lines(profile_fp)
+
+    if args.output_dir is None and len(args.files) == 1:
+        source = args.files[0]
+
+        if source == "-" or Path(source).is_file():
+            profiler = None
+            if profile is not None:
+                from markdownusm.instrument import Profiler
+
+                profiler = Profiler(callback=profile, source=source)
+
+            output = sys.stdout if args.o is None else args.o
+            options = (cache_dir, profiler, args.minify, args.compress)
+
+            if args.parallel:
+                _parallel(source, output, args.jobs, args.minify, args.compress)
+            elif source == "-":
+                convert(sys.stdin.read(), output, *options)
+            else:
+                convert_path(Path(source), output, *options)
+
+            if args.o is None:
+                print()
+            return
+
+    if args.o is not None:
+        parser.error("-o can only be used with a single input file")
+    if args.parallel:
+        parser.error("--parallel can only be used with a single input file")
+
+    sys.exit(
+        _convert_batch(
+            args.files,
+            args.output_dir,
+            args.jobs,
+            cache_dir,
+            profile,
+            minify=args.minify,
+            compress=args.compress,
+        )
+    )
+
+
+def _reverse(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    from markdownusm.reverse import reverse
+
+    if len(args.files) != 1:
+        parser.error("--reverse needs a single input file")
+
+    source = sys.stdin.buffer if args.files[0] == "-" else args.files[0]
+    fp = sys.stdout if args.o is None else args.o
+
+    for line in reverse(source):
+        fp.write(line + "\n")
+
+
+def _diff(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    from pathlib import Path
+
+    from markdownusm.diff import compare, read_ids
+    from markdownusm.parser import MarkdownParser
+    from markdownusm.reader import markdown_lines, read_chunks, stream_chunks
+
+    if len(args.files) != 1:
+        parser.error("--diff needs a single input file")
+
+    source = args.files[0]
+    chunks = stream_chunks(sys.stdin) if source == "-" else read_chunks(Path(source))
+    shapes = _converter().keyed_shapes(
+        MarkdownParser.from_lines(markdown_lines(chunks))
+    )
+
+    diff = compare(read_ids(str(args.diff)), shapes)
+    fp = sys.stdout if args.o is None else args.o
+
+    fp.writelines(diff.generate(args.minify))
+
+
+def _watch(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    from pathlib import Path
+
+    from markdownusm.watch import watch
+
+    source = Path(args.files[0])
+    if len(args.files) != 1 or not source.is_file():
+        parser.error("--watch needs a single input file")
+
+    if args.o is None:
+        destination = source.with_suffix(".dio")
+    else:
+        destination = Path(args.o.name)
+        args.o.close()
+
+    converter = _converter(args.minify, args.compress)
+
+    try:
+        watch(source, destination, interval=args.interval, converter=converter)
+    except KeyboardInterrupt:
+        pass
+
+
+def _convert_batch(
+    patterns: list[str],
+    output_dir: Optional[Path],
+    jobs: Optional[int],
+    cache_dir: Optional[Path],
+    profile: Optional[Callable[[Record], None]] = None,
+    minify: bool = False,
+    compress: bool = False,
+) -> int:
+    """Convert many files, printing a summary to stderr
+
+    Returns:
+        int: Exit status, non-zero when any file failed
+
+    """
+    from markdownusm.batch import collect, convert_files
+
+    sources = collect(patterns)
+    if not sources:
+        print("No markdown files found", file=sys.stderr)
+        return 1
+
+    failed = 0
+    results = convert_files(
+        sources,
+        output_dir=output_dir,
+        jobs=jobs,
+        cache_dir=cache_dir,
+        profile=profile is not None,
+        minify=minify,
+        compress=compress,
+    )
+    for result in results:
+        if profile is not None:
+            for record in result.records:
+                profile(record)
+
+        if result.ok:
+            print(f"converted {result.source} -> {result.destination}", file=sys.stderr)
+        else:
+            failed += 1
+            print(f"failed {result.source}: {result.error}", file=sys.stderr)
+
+    print(f"{len(sources) - failed} converted, {failed} failed", file=sys.stderr)
+
+    return 1 if failed else 0
+
+
+def _merge(
+    patterns: list[str],
+    destination: Path,
+    jobs: Optional[int],
+    minify: bool = False,
+    compress: bool = False,
+) -> int:
+    """Convert many files into pages of one file
+
+    Returns:
+        int: Exit status, non-zero when any file failed
+
+    """
+    import os
+
+    from markdownusm.batch import collect, merge_files
+
+    sources = collect(patterns)
+    if not sources:
+        print("No markdown files found", file=sys.stderr)
+        return 1
+
+    # Written next to the destination so that a failure leaves it untouched
+    tmp = destination.with_name(destination.name + ".tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as fp:
+            merge_files(sources, fp, jobs=jobs, minify=minify, compress=compress)
+        os.replace(tmp, destination)
+    except Exception as e:
+        tmp.unlink(missing_ok=True)
+        print(f"failed {destination}: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+
+    print(f"merged {len(sources)} files -> {destination}", file=sys.stderr)
+
+    return 0
+
+
+@lru_cache(maxsize=None)
+def _converter(minify: bool = False, compress: bool = False) -> Converter:
+    """Converter with default settings shared by every conversion"""
+    from markdownusm.converter import Converter
 
-    return export.render()
+    return Converter(minify=minify, compress=compress)
 
 
 if __name__ == "__main__":
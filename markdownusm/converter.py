@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+"""Convert markdown into draw.io XML"""
+
+from dataclasses import dataclass, field
+from itertools import repeat
+from typing import Iterable, Iterator, Optional, TextIO
+
+from pydantic import Field
+
+from markdownusm.instrument import Profiler
+from markdownusm.parser import MarkdownParser, StoryTable
+from markdownusm.reader import markdown_lines
+from markdownusm.usm import U, Usm, UsmSettings
+from markdownusm.xml import Key, Shape, XMLObjects, cell_id, with_id
+
+
+@dataclass
+class Sources:
+    """Positions of each kind of shape, stories in columnar storage
+
+    Kinds left empty are not converted
+
+    """
+
+    activities: list[dict[str, U]] = field(default_factory=list)
+    tasks: list[dict[str, U]] = field(default_factory=list)
+    stories: StoryTable = field(default_factory=StoryTable)
+    release_texts: list[dict[str, U]] = field(default_factory=list)
+    release_bars: list[dict[str, U]] = field(default_factory=list)
+
+    @classmethod
+    def from_parser(cls, parser: MarkdownParser) -> "Sources":
+        return cls(
+            parser.extract_activities_with_position(),
+            parser.extract_tasks_with_position(),
+            parser.story_table(),
+            parser.extract_release_texts_with_position(),
+            parser.create_release_bars_with_position(),
+        )
+
+    def __len__(self) -> int:
+        """Number of shapes"""
+        return (
+            len(self.activities)
+            + len(self.tasks)
+            + len(self.stories)
+            + len(self.release_texts)
+            + len(self.release_bars)
+        )
+
+
+class Converter(UsmSettings):
+    """Convert markdown into draw.io XML with fixed settings
+
+    Settings are validated once on construction, so that one instance can be
+    reused for any number of conversions
+
+    Examples:
+        >>> converter = Converter(padding=30, story_default_fill_color="#ffffff")
+        >>> converter.convert("# Activity\\n## Task\\nStory")
+        '\\n    <mxfile>...'
+
+    """
+
+    minify: bool = Field(False, title="Drop whitespace between tags")
+    compress: bool = Field(False, title="Compress diagram by deflate and base64")
+    cell_ids: bool = Field(True, title="Give cells ids from their places and texts")
+
+    def convert(self, markdown: str, profiler: Optional[Profiler] = None) -> str:
+        """Convert markdown into XML
+
+        Args:
+            profiler: Measures each stage when given
+
+        """
+        if profiler is not None:
+            return self._convert_profiled(markdown, profiler)
+
+        sources = Sources.from_parser(MarkdownParser(markdown=markdown))
+
+        return "".join(self.xml_objects().generate_xml(self.cells(sources)))
+
+    def convert_to(self, markdown: str, fp: TextIO) -> None:
+        """Write XML to a file-like object while shapes are being created"""
+        sources = Sources.from_parser(MarkdownParser(markdown=markdown))
+        fp.writelines(self.xml_objects().generate_xml(self.cells(sources)))
+
+    def convert_chunks(self, chunks: Iterable[str], fp: TextIO) -> None:
+        """Write XML converted from markdown read piece by piece
+
+        Neither the whole markdown nor the whole XML is held in memory
+
+        Examples:
+            >>> converter.convert_chunks(read_chunks(Path("huge.md")), fp)
+
+        """
+        sources = Sources.from_parser(MarkdownParser.from_lines(markdown_lines(chunks)))
+        fp.writelines(self.xml_objects().generate_xml(self.cells(sources)))
+
+    def convert_page(self, markdown: str, name: str) -> str:
+        """Convert markdown into a `<diagram>` page of a document with many pages
+
+        Examples:
+            >>> pages = [converter.convert_page(x, n) for n, x in maps.items()]
+            >>> converter.xml_objects().generate_pages(pages)
+
+        """
+        cells = self.cells(Sources.from_parser(MarkdownParser(markdown=markdown)))
+
+        return "".join(self.xml_objects().generate_diagram(cells, name))
+
+    def convert_many(self, markdowns: Iterable[str]) -> Iterator[str]:
+        """Convert markdown texts one by one in order"""
+        return map(self.convert, markdowns)
+
+    def shapes(self, markdown: str) -> Iterator[Shape]:
+        """Create shapes lazily in the order of the XML document"""
+        return self._shapes(Sources.from_parser(MarkdownParser(markdown=markdown)))
+
+    def keyed_shapes(self, parser: MarkdownParser) -> Iterator[tuple[Key, Shape]]:
+        """Create shapes lazily with their places, which their cell ids start with"""
+        sources = Sources.from_parser(parser)
+
+        return zip(self._keys(sources), self._shapes(sources))
+
+    def cells(self, sources: Sources) -> Iterator[str]:
+        """XML of every shape in the order of the XML document
+
+        Parts of `sources` may be empty to convert only some kinds of shapes
+
+        """
+        return map(self.cell, self._keys(sources), self._shapes(sources))
+
+    def cells_around(
+        self, parser: MarkdownParser, stories: Iterable[str]
+    ) -> Iterator[str]:
+        """XML of every shape with stories rendered already
+
+        Activities and tasks of `parser` come before `stories`, and release
+        texts and bars after them, in the order of the XML document
+
+        """
+        yield from self.cells(
+            Sources(
+                activities=parser.extract_activities_with_position(),
+                tasks=parser.extract_tasks_with_position(),
+            )
+        )
+        yield from stories
+        yield from self.cells(
+            Sources(
+                release_texts=parser.extract_release_texts_with_position(),
+                release_bars=parser.create_release_bars_with_position(),
+            )
+        )
+
+    def cell(self, key: Key, shape: Shape) -> str:
+        """XML of a shape, with an id from `key` unless `cell_ids` is off"""
+        xml = shape.to_xml()
+
+        return with_id(xml, cell_id(key, xml)) if self.cell_ids else xml
+
+    def xml_objects(self) -> XMLObjects:
+        """`XMLObjects` writing documents in the output format of these settings"""
+        return XMLObjects(minify=self.minify, compress=self.compress)
+
+    def usm(self, source: list[dict[str, U]]) -> Usm:
+        """Create `Usm` with these settings without validating them again"""
+        return Usm.from_settings(source, self)
+
+    @staticmethod
+    def _keys(sources: Sources) -> Iterator[Key]:
+        """Places of shapes created by `_shapes`, the same as `MapLayout`"""
+        stories = sources.stories
+
+        yield from (("activity", i, 0, 0) for i in range(len(sources.activities)))
+        yield from (("task", i, 0, 0) for i in range(len(sources.tasks)))
+        yield from zip(repeat("story"), stories.columns, stories.releases, stories.rows)
+        yield from (("release", i, 0, 0) for i in range(len(sources.release_texts)))
+        yield from (("bar", i, 0, 0) for i in range(len(sources.release_bars)))
+
+    def _shapes(self, sources: Sources) -> Iterator[Shape]:
+        yield from self.usm(sources.activities).iter_activities()
+        yield from self.usm(sources.tasks).iter_tasks()
+        yield from self.usm([]).iter_story_table(sources.stories)
+        yield from self.usm(sources.release_texts).iter_release_texts()
+        yield from self.usm(sources.release_bars).iter_release_bars()
+
+    def _convert_profiled(self, markdown: str, profiler: Profiler) -> str:
+        """Convert stage by stage so that each stage is measured on its own"""
+        with profiler.stage("parse") as record:
+            sources = Sources.from_parser(MarkdownParser(markdown=markdown))
+            record["shapes"] = len(sources)
+
+        with profiler.stage("layout") as record:
+            shapes = list(self._shapes(sources))
+            record["shapes"] = len(shapes)
+
+        with profiler.stage("to_xml") as record:
+            cells = list(map(self.cell, self._keys(sources), shapes))
+            record["shapes"] = len(cells)
+
+        with profiler.stage("render") as record:
+            xml = "".join(self.xml_objects().generate_xml(cells))
+            record["shapes"] = len(cells)
+
+        return xml
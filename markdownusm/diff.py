@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""Cells which differ between a draw.io file and markdown converted again
+
+Cells are matched by their places, the part of their ids before the hash
+given by `cell_id`. A cell whose place is only in the new map is added, one
+only in the old file is removed, and one in both whose hash differs is
+changed. Cells of the old file without such ids are left out, so a file
+converted before ids were given has every new cell added.
+
+Examples:
+    >>> old = read_ids("sample.dio")
+    >>> "".join(compare(old, converter.keyed_shapes(parser)).generate())
+    '<mxDiff>...</mxDiff>'
+
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import IO, Iterable, Iterator, Union
+
+from markdownusm.reverse import iter_cells
+from markdownusm.xml import Key, Shape, cell_id, minify, with_id
+
+# Id given by `cell_id`, its place and hash
+_CELL_ID = re.compile(r"([a-z]+-\d+-\d+-\d+)-[0-9a-f]{8}")
+
+
+@dataclass
+class CellDiff:
+    """Cells added, removed and changed by converting markdown again"""
+
+    # XML of new cells with their ids
+    added: list[str] = field(default_factory=list)
+    # Ids of old cells
+    removed: list[str] = field(default_factory=list)
+    # XML of new cells replacing old cells at the same places
+    changed: list[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def generate(self, minified: bool = False) -> Iterator[str]:
+        """Render the differences as one XML document
+
+        Examples:
+            >>> xml = "".join(CellDiff(removed=["story-0-0-1-5f3a09c1"]).generate(True))
+            >>> xml[xml.index("<removed>") : xml.index("<changed>")]
+            '<removed><mxCell id="story-0-0-1-5f3a09c1"/></removed>'
+
+        """
+        removed = (f'\n        <mxCell id="{x}"/>\n        ' for x in self.removed)
+        sections = [
+            ("added", self.added),
+            ("removed", removed),
+            ("changed", self.changed),
+        ]
+
+        yield "<mxDiff>" if minified else "\n<mxDiff>"
+        for name, cells in sections:
+            yield f"<{name}>" if minified else f"\n    <{name}>"
+            yield from map(minify, cells) if minified else cells
+            yield f"</{name}>" if minified else f"\n    </{name}>"
+        yield "</mxDiff>" if minified else "\n</mxDiff>\n"
+
+
+def place(cell: str) -> str:
+    """Part of a cell id before its hash, empty for ids not given by `cell_id`
+
+    Examples:
+        >>> place("story-2-1-0-5f3a09c1")
+        'story-2-1-0'
+
+    """
+    match = _CELL_ID.fullmatch(cell)
+
+    return match.group(1) if match else ""
+
+
+def read_ids(source: Union[str, IO[bytes]]) -> dict[str, str]:
+    """Ids of cells in the first diagram of a draw.io file keyed by their places
+
+    The file may be compressed. Cells are dropped as soon as they are read.
+
+    """
+    ids: dict[str, str] = {}
+
+    for elem in iter_cells(source):
+        if key := place(elem.get("id", "")):
+            ids[key] = elem.get("id", "")
+
+    return ids
+
+
+def compare(old: dict[str, str], shapes: Iterable[tuple[Key, Shape]]) -> CellDiff:
+    """Compare ids of an old file with shapes converted again
+
+    Args:
+        old: Ids keyed by their places, `read_ids`
+        shapes: New shapes with their places, `Converter.keyed_shapes`
+
+    """
+    diff = CellDiff()
+    seen = set()
+
+    for key, shape in shapes:
+        xml = shape.to_xml()
+        new = cell_id(key, xml)
+        seen.add(position := place(new))
+
+        if position not in old:
+            diff.added.append(with_id(xml, new))
+        elif old[position] != new:
+            diff.changed.append(with_id(xml, new))
+
+    diff.removed.extend(v for k, v in old.items() if k not in seen)
+
+    return diff
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+"""Lay out a story map again after editing one of its lines
+
+`MapLayout` keeps shapes keyed by their place in the map. Applying an
+`Edit` lays out the task column of the edited line again, and only the
+stories of other columns in releases whose rows moved. Activities, tasks
+and releases are always laid out again since there are few of them.
+
+Examples:
+    >>> layout = MapLayout.from_markdown(markdown)
+    >>> layout, diff = layout.apply(Edit("replace", 5, "Story 2!"))
+    >>> diff.changed
+    {('story', 0, 0, 1): RectangleRecord(text='Story 2', ...)}
+
+"""
+
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Optional
+
+from markdownusm.converter import Converter
+from markdownusm.parser import LineKind, MarkdownParser
+from markdownusm.reader import markdown_lines
+from markdownusm.xml import Key, Shape
+
+ACTIONS = ("insert", "delete", "replace")
+
+
+@dataclass(frozen=True)
+class Edit:
+    """Change of one line of `MarkdownParser.lines`
+
+    The line is a story, task, activity, release or separator depending on
+    its prefix, the same as in markdown. Text which is blank or a comment
+    is no line: inserting it changes nothing and replacing with it deletes.
+
+    Examples:
+        >>> Edit("insert", 3, "## Task 2")
+        >>> Edit("delete", 4)
+
+    """
+
+    # "insert" before `line`, "delete" or "replace" `line`
+    action: str
+    line: int
+    text: str = ""
+
+    def apply(self, lines: list[str]) -> list[str]:
+        """Lines after this edit, `lines` are left as they are"""
+        if self.action not in ACTIONS:
+            raise ValueError(f"action must be one of {ACTIONS}, not {self.action!r}")
+
+        stop = len(lines) + 1 if self.action == "insert" else len(lines)
+        if not 0 <= self.line < stop:
+            raise IndexError(f"line {self.line} is out of range")
+
+        text = list(markdown_lines([self.text]))
+        if len(text) > 1:
+            raise ValueError(f"text must be a single line, not {self.text!r}")
+
+        result = list(lines)
+
+        if self.action == "insert":
+            result[self.line : self.line] = text
+        elif self.action == "delete":
+            del result[self.line]
+        else:
+            result[self.line : self.line + 1] = text
+
+        return result
+
+
+@dataclass
+class LayoutDiff:
+    """Shapes which differ between two layouts"""
+
+    # New shapes at places which did not exist
+    added: dict[Key, Shape] = field(default_factory=dict)
+    # Old shapes at places which no longer exist
+    removed: dict[Key, Shape] = field(default_factory=dict)
+    # New shapes at places whose shapes changed
+    changed: dict[Key, Shape] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def compare(self, old: dict[Key, Shape], new: dict[Key, Shape]) -> None:
+        """Add differences between shapes of the same part of two layouts"""
+        for key, shape in new.items():
+            if key not in old:
+                self.added[key] = shape
+            elif old[key] != shape:
+                self.changed[key] = shape
+
+        for key in old.keys() - new.keys():
+            self.removed[key] = old[key]
+
+
+class MapLayout:
+    """Shapes of a story map keyed by their place in it
+
+    Layouts are not modified by `apply`, which returns a new layout sharing
+    shapes which did not change
+
+    """
+
+    def __init__(
+        self,
+        parser: MarkdownParser,
+        converter: Optional[Converter] = None,
+        columns: Optional[list[dict[Key, Shape]]] = None,
+    ):
+        """
+        Args:
+            columns: Stories of each column laid out already
+
+        """
+        self.converter = Converter() if converter is None else converter
+        self.parser = parser
+
+        self.heights = parser.release_index().heights
+        self.columns = (
+            [
+                _stories(parser, self.converter, column, lines)
+                for column, lines in enumerate(parser.task_ranges())
+            ]
+            if columns is None
+            else columns
+        )
+        self.head, self.tail = self._head(), self._tail()
+
+    @classmethod
+    def from_markdown(
+        cls, markdown: str, converter: Optional[Converter] = None
+    ) -> "MapLayout":
+        return cls(MarkdownParser(markdown=markdown), converter)
+
+    @property
+    def lines(self) -> list[str]:
+        return self.parser.lines or []
+
+    @property
+    def shapes(self) -> dict[Key, Shape]:
+        """Every shape in the order of the XML document"""
+        columns = (x.items() for x in self.columns)
+
+        return dict(chain(self.head.items(), *columns, self.tail.items()))
+
+    def render(self) -> str:
+        """Render XML document, same as `Converter.convert` of the lines"""
+        cells = (self.converter.cell(k, x) for k, x in self.shapes.items())
+
+        return "".join(self.converter.xml_objects().generate_xml(cells))
+
+    def apply(self, edit: Edit) -> tuple["MapLayout", LayoutDiff]:
+        """Lay out the map again after `edit`
+
+        Returns:
+            tuple: New layout and shapes which differ from this layout
+
+        """
+        parser = MarkdownParser.from_lines(edit.apply(self.lines))
+        heights = parser.release_index().heights
+        ranges = parser.task_ranges()
+        count = len(ranges)
+
+        # Columns from the edited one are laid out again, and every column
+        # after it as well when columns are added or removed
+        edited = max(0, self._column_of(edit, parser))
+        stop = count if count != len(self.columns) else edited + 1
+
+        # Rows of releases from this one moved
+        moved = next(
+            (i for i, (a, b) in enumerate(zip(self.heights, heights)) if a != b),
+            min(len(self.heights), len(heights)),
+        )
+
+        diff = LayoutDiff()
+        columns = []
+
+        for column in range(count):
+            if edited <= column < stop or column >= len(self.columns):
+                old = self.columns[column] if column < len(self.columns) else {}
+                new = _stories(parser, self.converter, column, ranges[column])
+                diff.compare(old, new)
+            elif heights != self.heights:
+                old = self.columns[column]
+                shifted = _stories(
+                    parser, self.converter, column, ranges[column], moved
+                )
+                diff.compare({k: v for k, v in old.items() if k[2] >= moved}, shifted)
+                new = {k: v for k, v in old.items() if k[2] < moved} | shifted
+            else:
+                new = self.columns[column]
+
+            columns.append(new)
+
+        for old in self.columns[count:]:
+            diff.compare(old, {})
+
+        layout = MapLayout(parser, self.converter, columns)
+        diff.compare(self.head, layout.head)
+        diff.compare(self.tail, layout.tail)
+
+        return layout, diff
+
+    def _column_of(self, edit: Edit, parser: MarkdownParser) -> int:
+        """First column which the edited line belongs to before or after the edit
+
+        A task added or removed splits or merges the columns around it, so
+        the line before the edited one is also taken into account
+
+        """
+        lines = range(edit.line - 1, edit.line + 1)
+        columns = [
+            x._ir.columns[i]
+            for x in (self.parser, parser)
+            for i in lines
+            if 0 <= i < len(x._ir.columns)
+        ]
+
+        return min(columns, default=0)
+
+    def _head(self) -> dict[Key, Shape]:
+        """Activities and tasks"""
+        usm, parser = self.converter.usm, self.parser
+        activities = usm(parser.extract_activities_with_position()).iter_activities()
+        tasks = usm(parser.extract_tasks_with_position()).iter_tasks()
+
+        return {
+            **{("activity", i, 0, 0): x for i, x in enumerate(activities)},
+            **{("task", i, 0, 0): x for i, x in enumerate(tasks)},
+        }
+
+    def _tail(self) -> dict[Key, Shape]:
+        """Release texts and bars"""
+        usm, parser = self.converter.usm, self.parser
+        texts = usm(parser.extract_release_texts_with_position()).iter_release_texts()
+        bars = usm(parser.create_release_bars_with_position()).iter_release_bars()
+
+        return {
+            **{("release", i, 0, 0): x for i, x in enumerate(texts)},
+            **{("bar", i, 0, 0): x for i, x in enumerate(bars)},
+        }
+
+
+def _stories(
+    parser: MarkdownParser,
+    converter: Converter,
+    column: int,
+    lines: range,
+    release: int = 0,
+) -> dict[Key, Shape]:
+    """Lay out stories of a column in releases from `release`
+
+    Args:
+        lines: Line numbers of the column in `task_ranges`
+
+    """
+    ir = parser._ir
+    stories = [
+        i for i in lines if ir.kinds[i] == LineKind.STORY and ir.releases[i] >= release
+    ]
+    shapes = converter.usm([]).iter_story_table(parser.story_table(stories))
+    keys = (("story", column, ir.releases[i], ir.rows[i]) for i in stories)
+
+    return dict(zip(keys, shapes))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Timing and counters of each conversion stage"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, TextIO
+
+Record = dict[str, Any]
+
+
+class Profiler:
+    """Record wall time, memory allocations and shape counts of each stage
+
+    Every stage produces a record like below, passed to `callback` as soon
+    as the stage ends and kept in `records`
+
+        {"stage": "parse", "seconds": 0.01, "shapes": 120,
+         "allocated_bytes": 5120, "peak_bytes": 20480, "allocated_blocks": 80}
+
+    Memory is traced by tracemalloc only when it is not tracing already.
+    Tracing slows down conversion, so pass `memory=False` for wall time only.
+
+    Examples:
+        >>> profiler = Profiler(callback=print)
+        >>> Converter().convert(markdown, profiler=profiler)
+
+    """
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[Record], None]] = None,
+        memory: bool = True,
+        **fields: Any,
+    ):
+        """
+        Args:
+            callback: Called with the record of each stage
+            memory: Trace memory allocations
+            fields: Added to every record, e.g. the source file
+
+        """
+        self.callback = callback
+        self.memory = memory
+        self.fields = fields
+        self.records: list[Record] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Record]:
+        """Measure a stage
+
+        The record is yielded so that the stage can set `shapes`
+
+        """
+        record: Record = dict(self.fields, stage=name, shapes=None)
+        tracing = self.memory and not tracemalloc.is_tracing()
+
+        if tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                record["allocated_bytes"] = current
+                record["peak_bytes"] = peak
+                record["allocated_blocks"] = len(tracemalloc.take_snapshot().traces)
+                tracemalloc.stop()
+
+            self.records.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+
+def json_lines(fp: TextIO) -> Callable[[Record], None]:
+    """Callback writing each record to `fp` as a line of JSON"""
+
+    def callback(record: Record) -> None:
+        fp.write(json.dumps(record) + "\n")
+        fp.flush()
+
+    return callback
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Columnar positions of shapes"""
+
+from array import array
+from typing import Optional, Union
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+U = Union[str, float]
+
+NAN = float("nan")
+
+
+class Layout:
+    """Positions of all shapes kept in contiguous `array('d')` columns
+
+    Missing values are stored as NaN
+
+    """
+
+    __slots__ = ("x", "y", "width")
+
+    def __init__(self, x: array, y: array, width: array):
+        self.x = x
+        self.y = y
+        self.width = width
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    @classmethod
+    def from_source(cls, source: list[dict[str, U]]) -> "Layout":
+        """Create columns from list of dicts whose keys are positions
+
+        Examples:
+            >>> Layout.from_source([dict(text="Task", x=0, y=1)]).y
+            array('d', [1.0])
+
+        """
+        return cls(
+            x=cls._column(source, "x"),
+            y=cls._column(source, "y"),
+            width=cls._column(source, "width"),
+        )
+
+    def transform(
+        self, start_x: float, start_y: float, step_x: float, step_y: float
+    ) -> "Layout":
+        """Convert relative positions to absolute positions
+
+        Horizontal positions and widths become `start_x + step_x * n`,
+        vertical positions become `start_y + step_y * n`
+
+        """
+        return Layout(
+            x=self._affine(self.x, start_x, step_x),
+            y=self._affine(self.y, start_y, step_y),
+            width=self._affine(self.width, start_x, step_x),
+        )
+
+    @staticmethod
+    def _column(source: list[dict[str, U]], key: str) -> array:
+        values: list[Optional[U]] = [dic.get(key) for dic in source]
+
+        return array("d", [NAN if v is None else float(v) for v in values])
+
+    @staticmethod
+    def _affine(values: array, start: float, step: float) -> array:
+        """Apply `start + step * n` to every value at once
+
+        NumPy is used when it is installed
+
+        """
+        if numpy is None:
+            return array("d", [start + step * v for v in values])
+
+        result = array("d")
+        result.frombytes(
+            (numpy.frombuffer(values, dtype=numpy.float64) * step + start).tobytes()
+        )
+
+        return result
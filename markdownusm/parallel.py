@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""Lay out and render stories of a huge map in worker processes
+
+Once release heights are known, stories of each task column are placed
+independently of other columns. The map is parsed once in this process,
+then split into ranges of task columns with about the same number of
+lines. Each worker parses its lines again, lays out their stories with the
+release offsets of the whole map and converts them by `to_xml`. Cells are
+put together in the order of the ranges, so the document is the same as
+`Converter.convert` writes.
+
+Examples:
+    >>> convert_parallel(markdown, Converter(), jobs=16)
+
+"""
+
+import os
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from itertools import chain
+from typing import Iterable, Iterator, Optional
+
+from markdownusm.converter import Converter, Sources
+from markdownusm.parser import MarkdownParser
+
+# Ranges of columns for each worker, so that short and tall ranges even out
+PARTS_PER_JOB = 4
+
+
+def partition(ranges: list[range], parts: int) -> list[range]:
+    """Split task columns into `parts` ranges with about as many lines
+
+    Args:
+        ranges: Line numbers of each task column, `MarkdownParser.task_ranges`
+
+    Examples:
+        >>> partition([range(0, 2), range(2, 3), range(3, 5)], 2)
+        [range(0, 2), range(2, 3)]
+
+    """
+    if not ranges:
+        return []
+
+    total = ranges[-1].stop - ranges[0].start
+    result = []
+    start = 0
+
+    for column, lines in enumerate(ranges):
+        done = lines.stop - ranges[0].start
+        if done * parts >= total * (len(result) + 1) or column == len(ranges) - 1:
+            result.append(range(start, column + 1))
+            start = column + 1
+
+    return result
+
+
+def render_stories(
+    lines: list[str], column: int, offsets: tuple[int, ...], converter: Converter
+) -> list[str]:
+    """Run in worker processes
+
+    Args:
+        lines: Lines of task columns, starting at a task
+        column: Index of the first of the columns in the whole map
+        offsets: First row of each release of the whole map
+
+    Returns:
+        list: XML of every story in the columns
+
+    """
+    table = MarkdownParser.from_lines(lines).story_table()
+    table.columns = array("l", (x + column for x in table.columns))
+    table.offsets = offsets
+
+    return list(converter.cells(Sources(stories=table)))
+
+
+def generate_parallel(
+    parser: MarkdownParser,
+    converter: Optional[Converter] = None,
+    jobs: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> Iterator[str]:
+    """Render XML document piece by piece, stories in worker processes
+
+    With `jobs=1` stories are rendered range by range in this process.
+
+    Args:
+        jobs: Number of worker processes, CPU count by default
+        executor: Executor used instead of a process pool
+
+    """
+    converter = Converter() if converter is None else converter
+    ranges = parser.task_ranges()
+    parts = partition(ranges, (jobs or os.cpu_count() or 1) * PARTS_PER_JOB)
+    chunks = [
+        parser.lines[ranges[x.start].start : ranges[x.stop - 1].stop] for x in parts
+    ]
+    render = partial(
+        render_stories,
+        offsets=parser.release_index().offsets,
+        converter=converter,
+    )
+
+    columns = [x.start for x in parts]
+
+    def document(stories: Iterable[list[str]]) -> Iterator[str]:
+        cells = converter.cells_around(parser, chain.from_iterable(stories))
+
+        return converter.xml_objects().generate_xml(cells)
+
+    if executor is not None:
+        yield from document(executor.map(render, chunks, columns))
+        return
+
+    if jobs == 1:
+        yield from document(map(render, chunks, columns))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from document(executor.map(render, chunks, columns))
+
+
+def convert_parallel(
+    markdown: str,
+    converter: Optional[Converter] = None,
+    jobs: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> str:
+    """Convert markdown into XML, the same as `Converter.convert`"""
+    parser = MarkdownParser(markdown=markdown)
+
+    return "".join(generate_parallel(parser, converter, jobs, executor))
@@ -1,13 +1,134 @@
 #!/usr/bin/env python
 
+from array import array
+from dataclasses import dataclass, field
+from enum import IntEnum
 from itertools import accumulate
-from typing import Optional, Union
+from typing import Iterable, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from markdownusm.layout import NAN, Layout
+from markdownusm.reader import markdown_lines, strip_comments
+from markdownusm.tokenizer import LineKind, classify
 
 U = Union[str, float]
 
 
+@dataclass
+class MarkdownIR:
+    """Intermediate representation of markdown lines
+
+    Every column is indexed by line number of `MarkdownParser.lines`.
+
+    """
+
+    # LineKind of each line
+    kinds: array = field(default_factory=lambda: array("B"))
+    # Text of each line without its prefix
+    texts: list[str] = field(default_factory=list)
+    # Task column each line belongs to, -1 before the first task
+    columns: array = field(default_factory=lambda: array("l"))
+    # Release number each line belongs to within its task
+    releases: array = field(default_factory=lambda: array("l"))
+    # Row of a story within its task and release
+    rows: array = field(default_factory=lambda: array("l"))
+    # Maximum number of stories in each release among all tasks
+    heights: array = field(default_factory=lambda: array("l", [0]))
+
+
+@dataclass(frozen=True)
+class ReleaseIndex:
+    """Height and first row of each release
+
+    Rows are counted from the first row of stories, so that a story is at
+    `offsets[release] + row`
+
+    Examples:
+        >>> ReleaseIndex.from_heights([1, 2, 1])
+        ReleaseIndex(heights=(1, 2, 1), offsets=(0, 1, 3))
+
+    """
+
+    heights: tuple[int, ...]
+    offsets: tuple[int, ...]
+
+    @classmethod
+    def from_heights(cls, heights: Iterable[int]) -> "ReleaseIndex":
+        heights = tuple(heights)
+        return cls(heights, tuple(accumulate(heights[:-1], initial=0)))
+
+    def row(self, release: int, row: int = 0) -> int:
+        """Row of a story from the first row of stories"""
+        return self.offsets[release] + row
+
+
+class StoryFlag(IntEnum):
+    """Fill color of a story given by its suffix"""
+
+    DEFAULT = 0
+    # `!` at the end
+    WARNING = 1
+    # `#hex` at the end
+    COLOR = 2
+
+
+def split_story(text: str) -> tuple[str, StoryFlag, str]:
+    """Split story text into text, flag and custom color
+
+    Examples:
+        >>> split_story("Story X!")
+        ('Story X', <StoryFlag.WARNING: 1>, '')
+        >>> split_story("Story X #000000")
+        ('Story X', <StoryFlag.COLOR: 2>, '#000000')
+
+    """
+    if text[-1] == "!":
+        return text[:-1], StoryFlag.WARNING, ""
+    if "#" in text:
+        text, color = text.split("#")[:2]
+        return text.strip(), StoryFlag.COLOR, "#" + color.strip()
+
+    return text, StoryFlag.DEFAULT, ""
+
+
+@dataclass
+class StoryTable:
+    """Stories stored in parallel columns
+
+    Texts and colors are interned in `strings` and referred to by index, so
+    that a story costs a few bytes in each array besides its distinct text
+
+    """
+
+    strings: list[str] = field(default_factory=list)
+    # Index in `strings` of the text without suffix
+    texts: array = field(default_factory=lambda: array("l"))
+    # StoryFlag given by the suffix
+    flags: array = field(default_factory=lambda: array("B"))
+    # Index in `strings` of the custom color, -1 without it
+    colors: array = field(default_factory=lambda: array("l"))
+    columns: array = field(default_factory=lambda: array("l"))
+    releases: array = field(default_factory=lambda: array("l"))
+    rows: array = field(default_factory=lambda: array("l"))
+    # First row of each release, `ReleaseIndex.offsets`
+    offsets: tuple[int, ...] = (0,)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def layout(self) -> Layout:
+        """Relative positions, the same as `extract_stories_with_position`"""
+        offsets = self.offsets
+        y = (2 + offsets[r] + row for r, row in zip(self.releases, self.rows))
+
+        return Layout(
+            x=array("d", self.columns),
+            y=array("d", y),
+            width=array("d", [NAN]) * len(self),
+        )
+
+
 class MarkdownParser(BaseModel):
     markdown: str = Field(title="Text written in markdown")
 
@@ -16,22 +137,72 @@ class MarkdownParser(BaseModel):
         title="List of markdown lines without blanks and comments"
     )
 
+    _ir: MarkdownIR = PrivateAttr()
+    _releases: Optional[ReleaseIndex] = PrivateAttr(None)
+
     def __init__(self, **data):
         super().__init__(**data)
 
         # Remove blank lines and comments
-        self.lines = list(
-            filter(
-                lambda x: x.strip() != "" and not x.startswith("<!--"),
-                self._remove_html_comment(self.markdown).split("\n"),
-            )
-        )
+        self.lines = list(markdown_lines([self.markdown]))
+        self._ir = self._tokenize(self.lines)
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "MarkdownParser":
+        """Create parser from lines without blanks and comments
+
+        `markdown` is left empty so that the text is not held twice
+
+        Examples:
+            >>> MarkdownParser.from_lines(markdown_lines(read_chunks(path)))
+
+        """
+        parser = cls.construct(markdown="", lines=list(lines))
+        parser._ir = cls._tokenize(parser.lines)
+
+        return parser
 
     @staticmethod
     def _remove_html_comment(target: str) -> str:
-        import re
+        return "".join(strip_comments([target]))
+
+    @classmethod
+    def _tokenize(cls, lines: list[str]) -> MarkdownIR:
+        """Classify every line and measure releases in a single pass
+
+        Examples:
+            >>> _tokenize(["## Task1", "Story1", "---", "Story2"]).kinds
+            array('B', [2, 4, 3, 4])
+
+        """
+        ir = MarkdownIR()
+        heights = ir.heights
+        column, release, row = -1, 0, 0
+
+        for line in lines:
+            kind, offset = classify(line)
+
+            if kind == LineKind.TASK:
+                column, release, row = column + 1, 0, 0
+            elif kind == LineKind.SEPARATOR:
+                release, row = release + 1, 0
+
+                # Releases grow one by one, and only tasks have releases
+                if column >= 0 and release == len(heights):
+                    heights.append(0)
+
+            ir.kinds.append(kind)
+            ir.texts.append(line[offset:])
+            ir.columns.append(column)
+            ir.releases.append(release)
+            ir.rows.append(row)
 
-        return re.sub(r"<!--[\s\S]*?-->", "", target)
+            if kind == LineKind.STORY:
+                if column >= 0 and row >= heights[release]:
+                    heights[release] = row + 1
+                row += 1
+
+        return ir
 
     def extract_activities_with_position(self) -> list[dict[str, U]]:
         """Create list of dicts whose keys are activities' texts and positions
@@ -44,12 +215,12 @@ class MarkdownParser(BaseModel):
             ]
 
         """
-        tasks: list[str] = self._extract_tasks()
-        activities_with_tasks: dict[str, str] = self._extract_activities_with_tasks()
+        ir = self._ir
 
+        # An activity starts at the column of the task following it
         return [
-            dict(text=k, x=tasks.index(v), y=0)
-            for k, v in activities_with_tasks.items()
+            dict(text=ir.texts[i], x=ir.columns[i] + 1, y=0)
+            for i in self._indices(LineKind.ACTIVITY)
         ]
 
     def extract_tasks_with_position(self) -> list[dict[str, U]]:
@@ -68,9 +239,14 @@ class MarkdownParser(BaseModel):
 
         return [dict(text=task, x=i, y=1) for i, task in enumerate(tasks)]
 
-    def extract_stories_with_position(self) -> list[dict[str, U]]:
+    def extract_stories_with_position(
+        self, lines: Optional[Iterable[int]] = None
+    ) -> list[dict[str, U]]:
         """Create list of dicts whose keys are stories' texts and positions
 
+        Args:
+            lines: Line numbers to restrict stories to, e.g. a range of `task_ranges`
+
         Examples:
             >>> extract_stories_with_position()
             [
@@ -81,64 +257,56 @@ class MarkdownParser(BaseModel):
 
         """
 
-        # tasks_and_stories: ['## Task', 'Story', '---', 'Story', ...]
-        tasks_and_stories = self._extract_tasks_and_stories()
+        ir = self._ir
+        offsets = self.release_index().offsets
 
-        # [['Story1', 'Story2', '---', 'Story3'], ['---', 'Story4', 'Story5', '---', 'Story6'], ['Story7', '---', 'Story8']]
-        split_by_task = self._divide_list_by_prefix(tasks_and_stories, "## ")[
-            1:
-        ]  # Remove first task
-
-        """
-        [
-            [ # Task
-                ['Story1', 'Story2'], # Release1
-                ['Story3'] # Release2
-            ],
-            [
-                [],
-                ['Story4', 'Story5'],
-                ['Story6']
-            ],
-            [
-                ['Story7'],
-                ['Story8']
-            ]
+        # Stories before the first task have no column and are not drawn
+        return [
+            dict(
+                text=ir.texts[i],
+                x=ir.columns[i],
+                y=2 + offsets[ir.releases[i]] + ir.rows[i],
+            )
+            for i in (self._indices(LineKind.STORY) if lines is None else lines)
+            if ir.kinds[i] == LineKind.STORY and ir.columns[i] >= 0
         ]
-        """
-
-        # Get maximum number of stories to identify release bars positions
-        number_of_stories_in_each_release = (
-            self._max_number_of_stories_in_each_release()
-        )
-        # Adjustment in vertical position
-        release_adjustment = list(
-            accumulate([0] + number_of_stories_in_each_release[:-1])
-        )
-
-        split_by_release = list(
-            map(lambda x: self._divide_list_by_prefix(x, "---"), split_by_task)
-        )
 
-        x = 0
-        y = 2
-        release_number = 0
-        result: list[dict[str, U]] = []
+    def story_table(self, lines: Optional[Iterable[int]] = None) -> StoryTable:
+        """Stories of `extract_stories_with_position` in columnar storage
 
-        for task in split_by_release:
-            release_number = 0
-            for release in task:
-                for story in release:
-                    result.append(
-                        dict(text=story, x=x, y=y + release_adjustment[release_number])
-                    )
-                    y += 1
+        Args:
+            lines: Line numbers to restrict stories to, e.g. a range of `task_ranges`
 
-                release_number += 1
-                y = 2
-            x += 1
+        """
+        ir = self._ir
+        kinds, columns = ir.kinds, ir.columns
+        indices = [
+            i
+            for i in (self._indices(LineKind.STORY) if lines is None else lines)
+            if kinds[i] == LineKind.STORY and columns[i] >= 0
+        ]
 
-        return result
+        strings: dict[str, int] = {}
+        intern = strings.setdefault
+        texts, flags, colors = array("l"), array("B"), array("l")
+
+        for i in indices:
+            text, flag, color = split_story(ir.texts[i])
+
+            texts.append(intern(text, len(strings)))
+            flags.append(flag)
+            colors.append(intern(color, len(strings)) if color else -1)
+
+        return StoryTable(
+            strings=list(strings),
+            texts=texts,
+            flags=flags,
+            colors=colors,
+            columns=array("l", (columns[i] for i in indices)),
+            releases=array("l", (ir.releases[i] for i in indices)),
+            rows=array("l", (ir.rows[i] for i in indices)),
+            offsets=self.release_index().offsets,
+        )
 
     def extract_release_texts_with_position(
         self,
@@ -150,26 +318,50 @@ class MarkdownParser(BaseModel):
         ]
         """
         releases = self._extract_releases()
-        number_of_stories = self._max_number_of_stories_in_each_release()
-        release_positions = list(accumulate([2] + number_of_stories[:-1]))
+        offsets = self.release_index().offsets
 
         return [
-            dict(text=release, x=-1, y=y)
-            for release, y in zip(releases, release_positions)
+            dict(text=release, x=-1, y=2 + offset)
+            for release, offset in zip(releases, offsets)
         ]
 
     def create_release_bars_with_position(self) -> list[dict[str, U]]:
-        from itertools import accumulate
+        offsets = self.release_index().offsets
+        number_of_tasks = len(self._indices(LineKind.TASK))
 
-        number_of_stories = self._max_number_of_stories_in_each_release()
-        number_of_stories_accumulate = list(accumulate([2] + number_of_stories[:-1]))
+        return [dict(x=-1, width=number_of_tasks, y=2 + x - 0.1) for x in offsets]
 
-        number_of_tasks = len(self._extract_tasks())
+    def release_index(self) -> ReleaseIndex:
+        """Heights and offsets of releases shared by every layout
 
-        return [
-            dict(x=-1, width=number_of_tasks, y=y - 0.1)
-            for y in number_of_stories_accumulate
-        ]
+        Computed once from heights measured by `_tokenize`
+
+        Examples:
+            >>> release_index("## Task1\nStory1\n---\nStory2\nStory3").row(1, 1)
+            2
+
+        """
+        if self._releases is None:
+            self._releases = ReleaseIndex.from_heights(self._ir.heights)
+
+        return self._releases
+
+    def task_ranges(self) -> list[range]:
+        """Line numbers belonging to each task column, starting at the task
+
+        Examples:
+            >>> task_ranges("# Activity\n## Task1\nStory1\n## Task2\nStory2")
+            [range(1, 3), range(3, 5)]
+
+        """
+        starts = self._indices(LineKind.TASK)
+        stops = starts[1:] + [len(self.lines)]
+
+        return [range(start, stop) for start, stop in zip(starts, stops)]
+
+    def _indices(self, kind: LineKind) -> list[int]:
+        """Line numbers of the given kind"""
+        return [i for i, k in enumerate(self._ir.kinds) if k == kind]
 
     def _extract_tasks(self) -> list[str]:
         """Create task list from markdown
@@ -179,12 +371,7 @@ class MarkdownParser(BaseModel):
             ['Task1', 'Task2', ...]
 
         """
-        return list(
-            map(
-                lambda x: x.replace("## ", ""),
-                filter(lambda x: x.startswith("## "), self.lines),
-            )
-        )
+        return [self._ir.texts[i] for i in self._indices(LineKind.TASK)]
 
     def _extract_activities_with_tasks(self) -> dict[str, str]:
         """Create a dictionary whose keys are activities and values are tasks
@@ -194,14 +381,9 @@ class MarkdownParser(BaseModel):
             {'Activity1': 'Task1', 'Activity1': 'Task2', ...}
 
         """
-        dic: dict[str, str] = {}
-        for i, v in enumerate(self.lines):
-            if not v.startswith("# "):
-                continue
-
-            dic = dic | {v.replace("# ", ""): self.lines[i + 1].replace("## ", "")}
+        texts = self._ir.texts
 
-        return dic
+        return {texts[i]: texts[i + 1] for i in self._indices(LineKind.ACTIVITY)}
 
     def _extract_releases(self) -> list[str]:
         """Create release list from markdown
@@ -210,12 +392,7 @@ class MarkdownParser(BaseModel):
             >>> _extract_releases("- Release1\n- Release2\n# Activity\n## Task)
             ['Release1', 'Release2', ...]
         """
-        return list(
-            map(
-                lambda x: x.replace("- ", ""),
-                filter(lambda x: x.startswith("- "), self.lines),
-            )
-        )
+        return [self._ir.texts[i] for i in self._indices(LineKind.RELEASE)]
 
     def _extract_tasks_and_stories(self) -> list[str]:
         """Create tasks(with #) and stories list from markdown
@@ -227,13 +404,11 @@ class MarkdownParser(BaseModel):
             ['## Task1', 'Story1', '---', 'Story2', ...]
 
         """
-        return list(
-            filter(
-                lambda x: not x.startswith("# ") and not x.startswith("- "), self.lines
-            )
-        )
+        kinds = (LineKind.TASK, LineKind.SEPARATOR, LineKind.STORY)
+
+        return [line for line, kind in zip(self.lines, self._ir.kinds) if kind in kinds]
 
-    def _max_number_of_stories_in_each_release(self) -> list[float]:
+    def _max_number_of_stories_in_each_release(self) -> list[int]:
         """Identify maximum number of stories in each release
 
         Examples:
@@ -241,47 +416,7 @@ class MarkdownParser(BaseModel):
             [1, 2]
 
         """
-        # e.g. ['## Task1', 'Story1', '---', 'Story2', ...]
-        tasks_and_stories = self._extract_tasks_and_stories()
-
-        stories: list[list[str]] = []
-        # Temporary list
-        contents: list[str] = []
-        for item in tasks_and_stories:
-            if item.startswith("## "):
-                if contents == []:
-                    continue
-
-                stories.append(contents)
-                contents = []
-            else:
-                contents.append(item)
-
-        # stories: [['Story1'], ['Story2'], ['---', 'Story3']]
-        stories.append(contents)
-
-        number_of_releases: int = (
-            max([len([item for item in x if item.startswith("---")]) for x in stories])
-            + 1
-        )
-
-        # number_of_tasks_in_each_release: [[1], [1], [0, 1]]
-        number_of_tasks_in_each_release: list[list[int]] = [
-            list(map(lambda x: len(x), self._divide_list_by_prefix(x, "---")))
-            for x in stories
-        ]
-
-        # Arrange lists in length
-        # number_of_tasks_in_releases: [[1, 0], [1, 0], [0, 1]]
-        number_of_stories_in_releases = list(
-            map(
-                lambda x: self._extend_list(x, number_of_releases),
-                number_of_tasks_in_each_release,
-            )
-        )
-
-        # Extract maximum number of each release
-        return list(map(lambda x: max(x), zip(*number_of_stories_in_releases)))
+        return list(self.release_index().heights)
 
     @staticmethod
     def _divide_list_by_prefix(target: list[str], prefix: str) -> list[list[str]]:
@@ -307,24 +442,3 @@ class MarkdownParser(BaseModel):
         result.append(child)
 
         return result
-
-    @staticmethod
-    def _extend_list(
-        source: list[int], disirable_length: int, complement: int = 0
-    ) -> list[int]:
-        """Extend list for arranging in numbers
-
-        Example:
-            >>> _extend_list([1, 2], 4)
-            [1, 2, 0, 0]
-
-        """
-        if len(source) >= disirable_length:
-            return source
-
-        result = [0 for x in range(disirable_length)]
-
-        for i in range(len(source)):
-            result[i] = source[i]
-
-        return result
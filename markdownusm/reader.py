@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""Read markdown piece by piece without holding the whole text
+
+Comments are removed and lines are split while chunks are read, so that
+huge markdown files are parsed from a memory-mapped file or a stream.
+
+"""
+
+import codecs
+import io
+import mmap
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, TextIO
+
+# 1 MiB
+CHUNK_SIZE = 1024 * 1024
+
+COMMENT_START = "<!--"
+COMMENT_END = "-->"
+
+
+def _partial(text: str, token: str) -> int:
+    """Length of the longest end of `text` which starts `token`
+
+    Examples:
+        >>> _partial("abc<!", "<!--")
+        2
+
+    """
+    for size in range(min(len(token) - 1, len(text)), 0, -1):
+        if text.endswith(token[:size]):
+            return size
+
+    return 0
+
+
+def strip_comments(chunks: Iterable[str]) -> Iterator[str]:
+    """Remove `<!-- -->` comments from text split into chunks
+
+    Comments may span chunks and lines. Only text which might start a comment
+    is held back between chunks. An unterminated comment is kept as it is,
+    so its text is held until the end.
+
+    Examples:
+        >>> "".join(strip_comments(["a<!-", "- b\\n -", "->c"]))
+        'ac'
+
+    """
+    pending = ""
+    # Text of the comment being read, None outside comments
+    comment: Optional[list[str]] = None
+
+    for chunk in chunks:
+        text = pending + chunk
+        pending = ""
+        position = 0
+        pieces = []
+
+        while True:
+            if comment is None:
+                start = text.find(COMMENT_START, position)
+                if start < 0:
+                    end = len(text) - _partial(text, COMMENT_START)
+                    pieces.append(text[position:end])
+                    pending = text[end:]
+                    break
+
+                pieces.append(text[position:start])
+                comment = []
+                position = start + len(COMMENT_START)
+            else:
+                end = text.find(COMMENT_END, position)
+                if end < 0:
+                    end = max(position, len(text) - len(COMMENT_END) + 1)
+                    comment.append(text[position:end])
+                    pending = text[end:]
+                    break
+
+                comment = None
+                position = end + len(COMMENT_END)
+
+        if output := "".join(pieces):
+            yield output
+
+    if comment is not None:
+        yield COMMENT_START + "".join(comment)
+
+    yield pending
+
+
+def split_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Split text into lines at `\\n` across chunks
+
+    Examples:
+        >>> list(split_lines(["a\\nb", "c\\n"]))
+        ['a', 'bc', '']
+
+    """
+    rest = ""
+
+    for chunk in chunks:
+        *lines, rest = (rest + chunk).split("\n")
+        yield from lines
+
+    yield rest
+
+
+def markdown_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Lines of markdown without blanks and comments
+
+    Same as the lines of `MarkdownParser`, from text split into chunks
+
+    """
+    for line in split_lines(strip_comments(chunks)):
+        if line.strip() != "" and not line.startswith(COMMENT_START):
+            yield line
+
+
+def read_chunks(
+    path: Path,
+    encoding: Optional[str] = None,
+    errors: str = "ignore",
+    size: int = CHUNK_SIZE,
+) -> Iterator[str]:
+    """Decode a file chunk by chunk through a memory map
+
+    `\r\n` and `\r` are read as `\n` the same as by `Path.read_text`.
+
+    Args:
+        encoding: Default encoding of the system when None
+        size: Number of bytes decoded at once
+
+    """
+    # Newlines are translated into "\n" as files opened in text mode are
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(encoding or sys.getdefaultencoding())(
+            errors=errors
+        ),
+        translate=True,
+    )
+
+    with path.open("rb") as fp:
+        try:
+            mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and special files cannot be mapped
+            yield from map(decoder.decode, iter(lambda: fp.read(size), b""))
+            yield decoder.decode(b"", final=True)
+            return
+
+        with mapped:
+            for start in range(0, len(mapped), size):
+                yield decoder.decode(mapped[start : start + size])
+
+    yield decoder.decode(b"", final=True)
+
+
+def stream_chunks(fp: TextIO, size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Read a text stream such as stdin chunk by chunk"""
+    return iter(lambda: fp.read(size), "")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+"""Convert draw.io XML created by markdownusm back into markdown
+
+Cells are read one by one with `iterparse` and dropped as soon as they are
+classified, so that only their texts and places are kept. Compressed
+diagrams are decompressed piece by piece into a pull parser.
+
+Cells are classified by the colors of `UsmSettings` and placed on the grid
+of the same settings, so that cells moved or edited in draw.io are put in
+the task column and release closest to them.
+
+"""
+
+import base64
+import zlib
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import IO, Iterable, Iterator, Optional, Union
+from urllib.parse import unquote_to_bytes
+from xml.etree import ElementTree
+
+from markdownusm.usm import UsmSettings
+
+# Number of base64 characters decoded at once, a multiple of 4
+CHUNK_SIZE = 64 * 1024
+
+Event = tuple[str, ElementTree.Element]
+
+
+@dataclass
+class StoryMapCells:
+    """Texts of cells and their places on the grid
+
+    Places are columns and rows relative to the first task, as in
+    `MarkdownParser`
+
+    """
+
+    # (column, text) of activities
+    activities: list[tuple[int, str]] = field(default_factory=list)
+    # Text of the task in each column
+    tasks: dict[int, str] = field(default_factory=dict)
+    # (column, row, text) of stories
+    stories: list[tuple[int, int, str]] = field(default_factory=list)
+    # (row, text) of release texts
+    releases: list[tuple[int, str]] = field(default_factory=list)
+    # First row of each release from release bars
+    bars: list[int] = field(default_factory=list)
+
+    def markdown_lines(self) -> Iterator[str]:
+        """Lines of markdown converted into these cells again"""
+        yield from (f"- {text}" for _, text in sorted(self.releases))
+        yield ""
+
+        starts = sorted(self.bars) or sorted(x for x, _ in self.releases) or [2]
+        columns = sorted(self.tasks.keys() | {x[0] for x in self.stories})
+        activities = sorted(self.activities)
+        stories = sorted(self.stories)
+
+        a = s = 0
+        for column in columns:
+            while a < len(activities) and activities[a][0] <= column:
+                yield f"# {activities[a][1]}"
+                a += 1
+
+            yield f"## {self.tasks.get(column, '')}"
+
+            release = 0
+            while s < len(stories) and stories[s][0] == column:
+                row, text = stories[s][1:]
+                for _ in range(release, max(0, bisect_right(starts, row) - 1)):
+                    yield "---"
+                    release += 1
+
+                yield text
+                s += 1
+
+            # Releases without stories at the end are kept by the last column
+            if column == columns[-1]:
+                yield from ["---"] * (len(starts) - 1 - release)
+
+            yield ""
+
+        # Activities after the last task
+        yield from (f"# {text}" for _, text in activities[a:])
+
+
+def reverse(
+    source: Union[str, IO[bytes]], settings: Optional[UsmSettings] = None
+) -> Iterator[str]:
+    """Convert the first diagram of draw.io XML into lines of markdown
+
+    Args:
+        source: Path or binary file of a `.dio` file
+        settings: Settings the diagram was created with, defaults when None
+
+    """
+    return read_cells(source, settings).markdown_lines()
+
+
+def read_cells(
+    source: Union[str, IO[bytes]], settings: Optional[UsmSettings] = None
+) -> StoryMapCells:
+    """Classify cells of the first diagram and place them on the grid"""
+    settings = UsmSettings() if settings is None else settings
+    step_x = settings.width + settings.padding
+    step_y = settings.height + settings.padding
+    cells = StoryMapCells()
+
+    def place(x: Optional[str], y: Optional[str]) -> tuple[int, int]:
+        column = round((float(x or 0) - settings.start_x) / step_x)
+        row = round((float(y or 0) - settings.start_y) / step_y)
+
+        return column, row
+
+    for elem in iter_cells(source):
+        style = _style(elem.get("style", ""))
+        text = elem.get("value", "")
+        geometry = elem.find("mxGeometry")
+
+        if geometry is None:
+            pass
+        elif elem.get("edge") == "1":
+            point = geometry.find("mxPoint[@as='sourcePoint']")
+            if point is not None:
+                cells.bars.append(place(point.get("x"), point.get("y"))[1])
+        elif elem.get("vertex") == "1":
+            column, row = place(geometry.get("x"), geometry.get("y"))
+            colors = (style.get("fillColor"), style.get("fontColor"))
+
+            if colors == (settings.activity_fill_color, settings.activity_font_color):
+                cells.activities.append((column, text))
+            elif colors == (settings.task_fill_color, settings.task_font_color):
+                cells.tasks[column] = text
+            elif column < 0 and colors[1] == settings.release_text_font_color:
+                cells.releases.append((row, text))
+            elif colors[1] == settings.story_font_color:
+                cells.stories.append((column, row, _story(text, colors[0], settings)))
+
+    return cells
+
+
+def _story(text: str, fill_color: Optional[str], settings: UsmSettings) -> str:
+    """Story line whose suffix gives the fill color of the cell"""
+    if fill_color == settings.story_default_fill_color or not fill_color:
+        return text
+    if fill_color == settings.story_warning_fill_color:
+        return f"{text}!"
+
+    return f"{text} {fill_color}"
+
+
+def _style(style: str) -> dict[str, str]:
+    """Parse style of a cell
+
+    Examples:
+        >>> _style("html=1;fillColor=#ffffff")
+        {'html': '1', 'fillColor': '#ffffff'}
+
+    """
+    return dict(x.split("=", 1) for x in style.split(";") if "=" in x)
+
+
+def iter_cells(source: Union[str, IO[bytes]]) -> Iterator[ElementTree.Element]:
+    """`mxCell` elements of the first diagram with their children
+
+    Cells read already are dropped from the tree, so that huge files are
+    read in constant memory
+
+    """
+    root: Optional[ElementTree.Element] = None
+
+    for event, elem in _graph_model_events(source):
+        if event == "start":
+            if elem.tag == "root":
+                root = elem
+            continue
+        if elem.tag != "mxCell":
+            continue
+
+        yield elem
+
+        if root is not None:
+            root.clear()
+
+
+def _graph_model_events(source: Union[str, IO[bytes]]) -> Iterator[Event]:
+    """Events of elements in the graph model of the first diagram"""
+    for event, elem in ElementTree.iterparse(source, events=("start", "end")):
+        if elem.tag == "mxfile":
+            continue
+        if elem.tag != "diagram":
+            yield event, elem
+            continue
+        if event == "start":
+            continue
+
+        # A compressed diagram has text instead of a graph model
+        if len(elem) == 0 and elem.text and elem.text.strip():
+            yield from _pull_events(_decompress("".join(elem.text.split())))
+
+        return
+
+
+def _decompress(diagram: str) -> Iterator[bytes]:
+    """Decode base64, inflate and URI decode a compressed diagram in chunks"""
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    rest = b""
+
+    for start in range(0, len(diagram), CHUNK_SIZE):
+        data = rest + decompressor.decompress(
+            base64.b64decode(diagram[start : start + CHUNK_SIZE])
+        )
+
+        # Escape sequences like %E6 may be split between chunks
+        cut = data.rfind(b"%", max(0, len(data) - 2))
+        cut = len(data) if cut < 0 else cut
+
+        yield unquote_to_bytes(data[:cut])
+        rest = data[cut:]
+
+    yield unquote_to_bytes(rest + decompressor.flush())
+
+
+def _pull_events(chunks: Iterable[bytes]) -> Iterator[Event]:
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.read_events()
+
+    parser.close()
+    yield from parser.read_events()
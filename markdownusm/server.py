@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+"""HTTP service converting markdown into draw.io XML
+
+Endpoints:
+    POST /convert: Markdown in the body, XML in the response
+    GET /health: `ok` while the service is running
+
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from http import HTTPStatus
+from typing import Optional
+
+# 16 MiB
+DEFAULT_MAX_BODY = 16 * 1024 * 1024
+
+
+def convert(markdown: str) -> str:
+    """Run in worker processes"""
+    from markdownusm.cli import parse
+
+    return parse(markdown)
+
+
+def _context() -> multiprocessing.context.BaseContext:
+    """Start workers from a clean process
+
+    Workers forked from the server, which are started on demand, would inherit
+    sockets of open connections and keep them open after they are closed.
+
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+
+    return multiprocessing.get_context()
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus):
+        super().__init__(status.phrase)
+        self.status = status
+
+
+class LRU:
+    """Recent results keyed by a hash of markdown"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items: OrderedDict[bytes, str] = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[str]:
+        if (value := self._items.get(key)) is not None:
+            self._items.move_to_end(key)
+
+        return value
+
+    def set(self, key: bytes, value: str) -> None:
+        if self.size <= 0:
+            return
+
+        self._items[key] = value
+        self._items.move_to_end(key)
+
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+
+class ConversionServer:
+    """Convert markdown over HTTP in a pool of worker processes
+
+    At most `concurrency` conversions run at once, others wait for them.
+    Results of recent requests are returned from memory.
+
+    Examples:
+        >>> server = ConversionServer(port=8080, jobs=4)
+        >>> asyncio.run(server.serve_forever())
+
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        jobs: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        cache_size: int = 1024,
+        max_body: int = DEFAULT_MAX_BODY,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        Args:
+            port: Port to listen to, any free port when 0
+            jobs: Number of worker processes, CPU count by default
+            concurrency: Maximum number of conversions at once, `jobs` by default
+            cache_size: Number of recent results kept in memory
+            max_body: Maximum size of markdown in bytes
+            executor: Executor used instead of a process pool
+
+        """
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+
+        self.concurrency = concurrency or jobs or os.cpu_count() or 1
+
+        self._executor = executor or ProcessPoolExecutor(
+            max_workers=jobs, mp_context=_context()
+        )
+        self._results = LRU(cache_size)
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Created in the event loop of the server
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def start(self) -> asyncio.AbstractServer:
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port actually bound when 0 is given
+        self.port = self._server.sockets[0].getsockname()[1]
+
+        return self._server
+
+    async def serve_forever(self) -> None:
+        server = await self.start()
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._executor.shutdown()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+        self._executor.shutdown()
+
+    async def convert(self, markdown: str) -> str:
+        """Convert markdown in the executor, returning recent results from memory"""
+        key = hashlib.sha256(markdown.encode("utf-8", errors="surrogatepass")).digest()
+
+        if (xml := self._results.get(key)) is not None:
+            return xml
+
+        assert self._semaphore is not None, "Server is not started"
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            xml = await loop.run_in_executor(self._executor, convert, markdown)
+
+        self._results.set(key, xml)
+
+        return xml
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            status, body, content_type = await self._respond(reader)
+        except HTTPError as e:
+            status, body, content_type = e.status, e.status.phrase, "text/plain"
+        except Exception as e:
+            status, content_type = HTTPStatus.INTERNAL_SERVER_ERROR, "text/plain"
+            body = f"{type(e).__name__}: {e}"
+
+        payload = body.encode("utf-8")
+        writer.write(
+            (
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+            + payload
+        )
+
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _respond(
+        self, reader: asyncio.StreamReader
+    ) -> tuple[HTTPStatus, str, str]:
+        """Read a request and create status, body and content type of a response"""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST)
+
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, _ = request_line.split(" ")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST)
+
+        headers = {
+            name.strip().lower(): value.strip()
+            for name, _, value in (x.partition(":") for x in header_lines if x)
+        }
+        path = path.split("?")[0]
+
+        if path == "/health":
+            if method != "GET":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+            return HTTPStatus.OK, "ok", "text/plain"
+
+        if path != "/convert":
+            raise HTTPError(HTTPStatus.NOT_FOUND)
+        if method != "POST":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+
+        try:
+            length = int(headers["content-length"])
+        except (KeyError, ValueError):
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED)
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST)
+        if length > self.max_body:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            body = await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST)
+
+        markdown = body.decode("utf-8", errors="ignore")
+
+        return HTTPStatus.OK, await self.convert(markdown), "application/xml"
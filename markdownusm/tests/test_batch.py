@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+import io
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+from markdownusm.batch import (
+    Source,
+    collect,
+    convert_file,
+    convert_files,
+    destination,
+    merge_files,
+)
+from markdownusm.xml import inflate
+
+
+@pytest.fixture
+def sources(tmp_path):
+    (tmp_path / "maps" / "sub").mkdir(parents=True)
+    for name in ["maps/a.md", "maps/sub/b.md", "c.md", "d.txt"]:
+        (tmp_path / name).write_text("# Activity\n## Task\nStory")
+
+    return tmp_path
+
+
+def test_collect(sources):
+    actual = collect(
+        [str(sources / "maps"), str(sources / "*.md"), str(sources / "maps/a.md")]
+    )
+
+    assert [(x.path.relative_to(sources), x.relative) for x in actual] == [
+        (Path("maps/a.md"), Path("a.md")),
+        (Path("maps/sub/b.md"), Path("sub/b.md")),
+        (Path("c.md"), Path("c.md")),
+    ]
+
+
+@pytest.mark.parametrize(
+    "output_dir, expected",
+    [(None, Path("maps/sub/b.dio")), (Path("out"), Path("out/sub/b.dio"))],
+)
+def test_destination(output_dir, expected):
+    source = Source(Path("maps/sub/b.md"), Path("sub/b.md"))
+    assert destination(source, output_dir) == expected
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_convert_files(sources, jobs):
+    targets = collect([str(sources / "maps")]) + [
+        Source(sources / "missing.md", Path("missing.md"))
+    ]
+    results = list(convert_files(targets, output_dir=sources / "out", jobs=jobs))
+
+    assert [x.ok for x in results] == [True, True, False]
+    assert (sources / "out" / "sub" / "b.dio").read_text().count("<mxCell") == 6
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+@pytest.mark.parametrize("compress", [False, True])
+def test_merge_files(sources, jobs, compress):
+    fp = io.StringIO()
+    merge_files(collect([str(sources / "maps")]), fp, jobs=jobs, compress=compress)
+
+    pages = ET.fromstring(fp.getvalue().strip())
+    assert [x.get("name") for x in pages] == ["a", "sub/b"]
+
+    for page in pages:
+        model = ET.fromstring(inflate(page.text)) if compress else page[0]
+        # Activity, task, story and release bar
+        assert len(model.findall("./root/mxCell")) == 2 + 4
+
+
+def test_collect_glob(sources):
+    (sources / "maps" / "other").mkdir()
+    (sources / "maps" / "other" / "b.md").write_text("## Task")
+
+    actual = collect([str(sources / "maps" / "**" / "b.md")])
+
+    assert [x.relative for x in actual] == [Path("other/b.md"), Path("sub/b.md")]
+
+
+def test_convert_files_shared_destination(sources):
+    targets = [
+        Source(sources / "maps/a.md", Path("a.md")),
+        Source(sources / "maps/sub/b.md", Path("a.md")),
+        Source(sources / "c.md", Path("c.md")),
+    ]
+    results = list(convert_files(targets, output_dir=sources / "out", jobs=1))
+
+    assert [x.ok for x in results] == [False, False, True]
+    assert not (sources / "out" / "a.dio").exists()
+
+
+def test_convert_file_keeps_output(sources):
+    output = sources / "out.dio"
+    output.write_text("previous")
+
+    assert not convert_file(sources / "missing.md", output).ok
+    assert output.read_text() == "previous"
+    assert list(sources.glob("*.tmp")) == []
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import io
+import os
+
+from markdownusm.cache import OutputCache, usm_settings
+
+
+def test_wrap(tmp_path):
+    calls = []
+
+    def parse(markdown):
+        calls.append(markdown)
+        return markdown.upper()
+
+    cached = OutputCache(tmp_path).wrap(parse)
+
+    assert [cached("a"), cached("a"), cached("b")] == ["A", "A", "B"]
+    assert calls == ["a", "b"]
+
+
+def test_key():
+    cache = OutputCache()
+    settings = usm_settings()
+
+    assert cache.key("a", settings) == cache.key("a", dict(settings))
+    assert cache.key("a", settings) != cache.key("b", settings)
+    assert cache.key("a", settings) != cache.key("a", settings | dict(padding=0))
+
+
+def test_evict(tmp_path):
+    cache = OutputCache(tmp_path, max_bytes=10)
+
+    cache.set("old", "12345")
+    cache.set("new", "12345")
+    os.utime(tmp_path / "old.xml", (0, 0))
+    assert cache.get("new") == "12345"
+
+    cache.set("newest", "12345")
+
+    assert cache.get("old") is None
+    assert cache.get("new") == "12345"
+    assert cache.get("newest") == "12345"
+
+
+def test_set_too_large(tmp_path):
+    cache = OutputCache(tmp_path, max_bytes=10)
+
+    cache.set("small", "12345")
+    cache.set("large", "12345678901")
+
+    assert cache.get("small") == "12345"
+    assert cache.get("large") is None
+
+
+def test_stream(tmp_path):
+    calls = []
+
+    def write(markdown, fp):
+        calls.append(markdown)
+        fp.writelines([markdown, markdown.upper()])
+
+    cached = OutputCache(tmp_path, max_bytes=10).stream(write)
+    outputs = []
+    for markdown in ["ab", "ab", "abcdef", "abcdef"]:
+        fp = io.StringIO()
+        cached(markdown, fp)
+        outputs.append(fp.getvalue())
+
+    assert outputs == ["abAB", "abAB", "abcdefABCDEF", "abcdefABCDEF"]
+    # Documents larger than the cache are written but not stored
+    assert calls == ["ab", "abcdef", "abcdef"]
+    assert [x.suffix for x in tmp_path.iterdir()] == [".xml"]
+
+
+def test_max_source_bytes():
+    assert OutputCache(max_bytes=256 * 1024 * 1024).max_source_bytes == 2 * 1024 * 1024
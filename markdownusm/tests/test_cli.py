@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from markdownusm import cli
+
+
+def test_import_is_lazy():
+    code = (
+        "import sys; sys.argv = ['service', '--unknown']; "
+        "import markdownusm.cli; "
+        "print(any(x in sys.modules for x in ['pydantic', 'jinja2', 'argparse']))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert process.stdout.strip() == "False"
+
+
+def test_main(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "map.md"
+    source.write_text("# Activity\n## Task\nStory")
+    monkeypatch.setattr(sys, "argv", ["musm", str(source), "--no-cache"])
+
+    cli.main()
+
+    assert capsys.readouterr().out == cli.parse(source.read_text()) + "\n"
+
+
+def test_main_merge_single_input(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "map.md"
+    source.write_text("# Activity\n## Task\nStory")
+    destination = tmp_path / "out.dio"
+    monkeypatch.setattr(sys, "argv", ["musm", str(source), "-m", str(destination)])
+
+    with pytest.raises(SystemExit) as e:
+        cli.main()
+
+    assert e.value.code == 0
+    assert capsys.readouterr().out == ""
+    assert destination.read_text().count("<diagram") == 1
+
+
+@pytest.mark.parametrize(
+    "options",
+    [["a.md", "b.md"], ["a.md", "-d", "out"], ["a.md", "-m", "out.dio"], ["*.md"]],
+)
+def test_main_parallel_single_input(tmp_path, monkeypatch, options):
+    (tmp_path / "a.md").write_text("## Task\nStory")
+    (tmp_path / "b.md").write_text("## Task\nStory")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["musm", "--parallel", *options])
+
+    with pytest.raises(SystemExit) as e:
+        cli.main()
+
+    assert e.value.code == 2
+
+
+def test_main_profile(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "map.md"
+    source.write_text("# Activity\n## Task\nStory")
+    profile = tmp_path / "profile.jsonl"
+    monkeypatch.setattr(sys, "argv", ["musm", str(source), "--profile", str(profile)])
+
+    cli.main()
+
+    assert capsys.readouterr().out == cli.parse(source.read_text()) + "\n"
+    records = [json.loads(x) for x in profile.read_text().splitlines()]
+    assert records and all(x["source"] == str(source) for x in records)
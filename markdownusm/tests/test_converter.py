@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+import io
+import re
+
+import pytest
+from markdownusm import Converter
+from markdownusm.parser import MarkdownParser
+from markdownusm.usm import Usm
+from markdownusm.xml import XMLObjects
+from pydantic import ValidationError
+
+
+@pytest.fixture
+def markdown():
+    return "- Release\n# Activity\n## Task\nStory\n---\nStory!\n## Task\nStory #a6dfb5"
+
+
+def test_convert(markdown):
+    parser = MarkdownParser(markdown=markdown)
+    shapes = (
+        Usm(source=parser.extract_activities_with_position()).to_activities()
+        + Usm(source=parser.extract_tasks_with_position()).to_tasks()
+        + Usm(source=parser.extract_stories_with_position()).to_stories()
+        + Usm(source=parser.extract_release_texts_with_position()).to_release_texts()
+        + Usm(source=parser.create_release_bars_with_position()).to_release_bars()
+    )
+
+    expected = XMLObjects(shapes=shapes).render()
+    assert Converter(cell_ids=False).convert(markdown) == expected
+
+
+def test_cell_ids(markdown):
+    xml = Converter().convert(markdown)
+    ids = re.findall(r'<mxCell id="([^"]+)"', xml)
+
+    assert ids[:2] == ["0", "1"]
+    assert [x.rsplit("-", 1)[0] for x in ids[2:]] == [
+        "activity-0-0-0",
+        "task-0-0-0",
+        "task-1-0-0",
+        "story-0-0-0",
+        "story-0-1-0",
+        "story-1-0-0",
+        "release-0-0-0",
+        "bar-0-0-0",
+        "bar-1-0-0",
+    ]
+    assert Converter().convert(markdown) == xml
+    assert re.sub(r' id="[^"]+-[0-9a-f]{8}"', "", xml) == Converter(
+        cell_ids=False
+    ).convert(markdown)
+
+    # Only the hash of the edited story changes
+    edited = Converter().convert(markdown.replace("Story!", "Story 2"))
+    changed = set(re.findall(r'<mxCell id="([^"]+)"', edited)) - set(ids)
+    assert [x.rsplit("-", 1)[0] for x in changed] == ["story-0-1-0"]
+
+
+def test_convert_to(markdown):
+    converter = Converter(padding=40)
+    fp = io.StringIO()
+    converter.convert_to(markdown, fp)
+
+    assert fp.getvalue() == converter.convert(markdown)
+    assert converter.convert(markdown) != Converter().convert(markdown)
+
+
+def test_convert_many(markdown):
+    converter = Converter()
+
+    assert list(converter.convert_many([markdown, ""])) == [
+        converter.convert(markdown),
+        converter.convert(""),
+    ]
+
+
+def test_compress(markdown):
+    compressed = Converter(compress=True).convert(markdown)
+
+    assert len(compressed) < len(Converter(minify=True).convert(markdown))
+    assert len(Converter(minify=True).convert(markdown)) < len(
+        Converter().convert(markdown)
+    )
+
+
+def test_validation():
+    with pytest.raises(ValidationError):
+        Converter(padding="wide")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+import io
+
+import pytest
+from markdownusm.converter import Converter
+from markdownusm.diff import CellDiff, compare, place, read_ids
+from markdownusm.parser import MarkdownParser
+
+MARKDOWN = "- R\n# A\n## T1\nS1\n---\nS2\n## T2\nS3"
+
+
+def diff(old, new, converter=None):
+    converter = Converter() if converter is None else converter
+    source = io.BytesIO(converter.convert(old).encode())
+    shapes = Converter().keyed_shapes(MarkdownParser(markdown=new))
+
+    return compare(read_ids(source), shapes)
+
+
+def places(cells):
+    return [place(x.split('id="')[1].split('"')[0]) for x in cells]
+
+
+def test_place():
+    assert place("story-2-1-0-5f3a09c1") == "story-2-1-0"
+    assert place("1") == place("story-2-1-0") == place("x-5f3a09c1") == ""
+
+
+@pytest.mark.parametrize(
+    "converter", [Converter(), Converter(minify=True), Converter(compress=True)]
+)
+def test_read_ids(converter):
+    ids = read_ids(io.BytesIO(converter.convert(MARKDOWN).encode()))
+
+    assert sorted(ids) == [
+        "activity-0-0-0",
+        "bar-0-0-0",
+        "bar-1-0-0",
+        "release-0-0-0",
+        "story-0-0-0",
+        "story-0-1-0",
+        "story-1-0-0",
+        "task-0-0-0",
+        "task-1-0-0",
+    ]
+    assert all(place(v) == k for k, v in ids.items())
+
+
+def test_compare_unchanged():
+    assert not diff(MARKDOWN, MARKDOWN)
+
+
+def test_compare_edited():
+    result = diff(MARKDOWN, MARKDOWN.replace("S1", "S1!"))
+
+    assert (result.added, result.removed) == ([], [])
+    assert places(result.changed) == ["story-0-0-0"]
+    assert 'value="S1"' in result.changed[0]
+
+
+def test_compare_added_and_removed():
+    result = diff(MARKDOWN, MARKDOWN.replace("\nS3", "") + "\n## T3\nS4\nS5")
+
+    assert places(result.added) == ["task-2-0-0", "story-2-0-0", "story-2-0-1"]
+    assert [place(x) for x in result.removed] == ["story-1-0-0"]
+    # Release 1 moves down, and release bars are as wide as the tasks
+    assert places(result.changed) == ["story-0-1-0", "bar-0-0-0", "bar-1-0-0"]
+
+
+def test_compare_without_ids():
+    result = diff(MARKDOWN, MARKDOWN, Converter(cell_ids=False))
+
+    assert len(result.added) == 9
+    assert (result.removed, result.changed) == ([], [])
+
+
+def test_generate():
+    result = CellDiff(removed=["story-0-0-1-5f3a09c1"])
+
+    assert "".join(result.generate(True)) == (
+        '<mxDiff><added></added><removed><mxCell id="story-0-0-1-5f3a09c1"/>'
+        "</removed><changed></changed></mxDiff>"
+    )
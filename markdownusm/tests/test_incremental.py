@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+import random
+
+import pytest
+from markdownusm.converter import Converter
+from markdownusm.incremental import Edit, MapLayout
+
+
+@pytest.fixture
+def layout():
+    markdown = """
+- Release1
+- Release2
+
+# Activity1
+## Task1
+Story1
+---
+Story2
+## Task2
+Story3
+---
+Story4
+"""
+    return MapLayout.from_markdown(markdown)
+
+
+def test_replace_story(layout):
+    actual, diff = layout.apply(Edit("replace", 4, "Story1!"))
+
+    assert list(diff.changed) == [("story", 0, 0, 0)]
+    assert diff.changed[("story", 0, 0, 0)].text == "Story1"
+    assert not diff.added and not diff.removed
+    # Columns which did not change are shared
+    assert actual.columns[1] is layout.columns[1]
+
+
+def test_insert_story(layout):
+    actual, diff = layout.apply(Edit("insert", 5, "Story5"))
+
+    assert list(diff.added) == [("story", 0, 0, 1)]
+    # Stories of the second release in every column and the second release
+    # moved down
+    assert set(diff.changed) == {
+        ("story", 0, 1, 0),
+        ("story", 1, 1, 0),
+        ("release", 1, 0, 0),
+        ("bar", 1, 0, 0),
+    }
+    assert not diff.removed
+
+
+def test_delete_task(layout):
+    actual, diff = layout.apply(Edit("delete", 7))
+
+    assert actual.render() == Converter().convert("\n".join(actual.lines))
+    assert ("task", 1, 0, 0) in diff.removed
+    # Stories of the second task joined the first column
+    assert ("story", 0, 1, 1) in diff.added
+
+
+def test_random_edits():
+    rng = random.Random(0)
+    texts = ["## Task", "# Activity", "- Release", "---", "Story", "Story!"]
+    texts += ["", "   ", "<!-- note -->"]
+    layout = MapLayout.from_markdown("## Task\nStory")
+
+    for _ in range(200):
+        action = rng.choice(["insert", "delete", "replace"])
+        if action != "insert" and not layout.lines:
+            continue
+
+        stop = len(layout.lines) + (action == "insert")
+        edit = Edit(action, rng.randrange(stop), rng.choice(texts))
+        before = layout.shapes
+        layout, diff = layout.apply(edit)
+        after = layout.shapes
+
+        assert layout.render() == Converter().convert("\n".join(layout.lines))
+        assert diff.added.keys() == after.keys() - before.keys()
+        assert diff.removed.keys() == before.keys() - after.keys()
+        assert diff.changed == {
+            k: v for k, v in after.items() if k in before and before[k] != v
+        }
+
+
+@pytest.mark.parametrize(
+    "edit, error",
+    [
+        (Edit("move", 0), ValueError),
+        (Edit("delete", 11), IndexError),
+        (Edit("insert", 0, "Story\nStory"), ValueError),
+    ],
+)
+def test_invalid_edit(layout, edit, error):
+    with pytest.raises(error):
+        layout.apply(edit)
+
+
+def test_blank_edit():
+    lines = ["## Task", "Story", "Story!"]
+
+    assert Edit("insert", 1, "").apply(lines) == lines
+    assert Edit("replace", 1, "<!-- note -->").apply(lines) == ["## Task", "Story!"]
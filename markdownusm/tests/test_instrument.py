@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+import io
+import json
+
+import pytest
+from markdownusm.converter import Converter
+from markdownusm.instrument import Profiler, json_lines
+
+
+@pytest.fixture
+def markdown():
+    return "- Release\n# Activity\n## Task\nStory\nStory"
+
+
+def test_profiler(markdown):
+    records = []
+    profiler = Profiler(callback=records.append, source="map.md")
+
+    xml = Converter().convert(markdown, profiler=profiler)
+
+    assert xml == Converter().convert(markdown)
+    assert records == profiler.records
+    assert [x["stage"] for x in records] == ["parse", "layout", "to_xml", "render"]
+    assert [x["shapes"] for x in records] == [6, 6, 6, 6]
+    assert all(x["source"] == "map.md" for x in records)
+    assert all(x["peak_bytes"] >= x["allocated_bytes"] >= 0 for x in records)
+
+
+def test_profiler_without_memory(markdown):
+    profiler = Profiler(memory=False)
+    Converter().convert(markdown, profiler=profiler)
+
+    assert all("peak_bytes" not in x for x in profiler.records)
+    assert all(x["seconds"] >= 0 for x in profiler.records)
+
+
+def test_json_lines(markdown):
+    fp = io.StringIO()
+    Converter().convert(markdown, profiler=Profiler(callback=json_lines(fp)))
+
+    lines = fp.getvalue().splitlines()
+    assert [json.loads(x)["stage"] for x in lines] == [
+        "parse",
+        "layout",
+        "to_xml",
+        "render",
+    ]
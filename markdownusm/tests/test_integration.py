@@ -75,6 +75,9 @@ def expected():
         <mxCell value="Activity" style="html=1;rounded=0;whiteSpace=wrap;fillColor=#1F568A;strokeColor=none;fontColor=#FFFFFF;align=left;verticalAlign=top;spacingLeft=5;spacingRight=5;shadow=1" parent="1" vertex="1">
             <mxGeometry x="290.0" y="50.0" width="140" height="60" as="geometry"/>
         </mxCell>
+        <mxCell value="Activity" style="html=1;rounded=0;whiteSpace=wrap;fillColor=#1F568A;strokeColor=none;fontColor=#FFFFFF;align=left;verticalAlign=top;spacingLeft=5;spacingRight=5;shadow=1" parent="1" vertex="1">
+            <mxGeometry x="610.0" y="50.0" width="140" height="60" as="geometry"/>
+        </mxCell>
         <mxCell value="Task" style="html=1;rounded=0;whiteSpace=wrap;fillColor=#3288C4;strokeColor=none;fontColor=#FFFFFF;align=left;verticalAlign=top;spacingLeft=5;spacingRight=5;shadow=1" parent="1" vertex="1">
             <mxGeometry x="290.0" y="130.0" width="140" height="60" as="geometry"/>
         </mxCell>
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+from array import array
+
+import pytest
+from markdownusm import layout
+from markdownusm.layout import Layout
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def use_numpy(request, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(layout, "numpy", None)
+    elif layout.numpy is None:
+        pytest.skip("NumPy is not installed")
+
+
+def test_from_source():
+    actual = Layout.from_source(
+        [dict(text="Task", x=0, y=1), dict(x=-1, width=3, y=1.9)]
+    )
+
+    assert actual.x == array("d", [0, -1])
+    assert actual.y == array("d", [1, 1.9])
+    assert actual.width[1] == 3
+
+
+@pytest.mark.usefixtures("use_numpy")
+def test_transform():
+    source = Layout.from_source([dict(x=0, y=0), dict(x=-1, width=3, y=1.9)])
+    actual = source.transform(start_x=290, start_y=50, step_x=160, step_y=80)
+
+    assert actual.x == array("d", [290.0, 130.0])
+    assert actual.y == array("d", [50.0, 50 + 80 * 1.9])
+    assert actual.width[1] == 770.0
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from markdownusm.converter import Converter
+from markdownusm.parallel import convert_parallel, partition
+
+MARKDOWN = """
+- Release 1
+- Release 2
+
+Story before tasks
+# Activity 1
+## Task 1
+Story 1
+---
+Story 2!
+Story 3
+## Task 2
+---
+---
+Story 4 #a6dfb5
+<!-- comment -->
+# Activity 2
+## Task 3
+Story 5
+Story 6
+## Task 4
+"""
+
+
+@pytest.mark.parametrize(
+    "ranges, parts, expected",
+    [
+        ([range(0, 2), range(2, 3), range(3, 5)], 2, [range(0, 2), range(2, 3)]),
+        ([range(0, 2), range(2, 3)], 4, [range(0, 1), range(1, 2)]),
+        ([range(1, 9)], 3, [range(0, 1)]),
+        ([], 3, []),
+    ],
+)
+def test_partition(ranges, parts, expected):
+    assert partition(ranges, parts) == expected
+
+
+@pytest.mark.parametrize("markdown", [MARKDOWN, "Story", ""])
+@pytest.mark.parametrize(
+    "converter",
+    [Converter(), Converter(padding=30, minify=True), Converter(compress=True)],
+)
+def test_convert_parallel(markdown, converter):
+    expected = converter.convert(markdown)
+    assert convert_parallel(markdown, converter, jobs=1) == expected
+
+
+def test_convert_parallel_processes():
+    converter = Converter()
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        actual = convert_parallel(MARKDOWN, converter, jobs=2, executor=executor)
+
+    assert actual == converter.convert(MARKDOWN)
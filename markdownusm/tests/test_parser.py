@@ -1,7 +1,12 @@
 #!/usr/bin/env python
 
 import pytest
-from markdownusm.parser import MarkdownParser
+from markdownusm.parser import (
+    LineKind,
+    MarkdownParser,
+    ReleaseIndex,
+    StoryFlag,
+)
 
 
 @pytest.mark.parametrize(
@@ -33,6 +38,35 @@ def test_constructor(markdown, expected):
     assert len(obj.lines) == expected
 
 
+@pytest.mark.parametrize(
+    "markdown, kinds, texts",
+    [
+        (
+            "- Release\n# Activity\n## Task\nStory\n---\nStory",
+            [
+                LineKind.RELEASE,
+                LineKind.ACTIVITY,
+                LineKind.TASK,
+                LineKind.STORY,
+                LineKind.SEPARATOR,
+                LineKind.STORY,
+            ],
+            ["Release", "Activity", "Task", "Story", "---", "Story"],
+        ),
+        (
+            "## Task ## 2\nStory - 1",
+            [LineKind.TASK, LineKind.STORY],
+            ["Task ## 2", "Story - 1"],
+        ),
+        ("", [], []),
+    ],
+)
+def test_tokenize(markdown, kinds, texts):
+    ir = MarkdownParser(markdown=markdown)._ir
+    assert list(ir.kinds) == kinds
+    assert ir.texts == texts
+
+
 @pytest.mark.parametrize(
     "markdown, expected",
     [
@@ -125,6 +159,15 @@ def test_max_number_of_stories_in_each_release(markdown, expected):
     assert actual == expected
 
 
+def test_release_index():
+    markdown = "---\nStory\n## Task\nStory\n---\n---\nStory\nStory\n## Task\n---\nStory"
+    index = MarkdownParser(markdown=markdown).release_index()
+
+    # Separators and stories before the first task are not counted
+    assert index == ReleaseIndex(heights=(1, 1, 2), offsets=(0, 1, 2))
+    assert index.row(2, 1) == 3
+
+
 @pytest.mark.parametrize(
     "markdown, expected",
     [
@@ -134,7 +177,15 @@ def test_max_number_of_stories_in_each_release(markdown, expected):
                 {"text": "Activity1", "x": 0, "y": 0},
                 {"text": "Activity2", "x": 2, "y": 0},
             ],
-        )
+        ),
+        (
+            "# Activity\n## Task\n## Task\n# Activity\n## Task\n# Activity\n## Task",
+            [
+                {"text": "Activity", "x": 0, "y": 0},
+                {"text": "Activity", "x": 2, "y": 0},
+                {"text": "Activity", "x": 3, "y": 0},
+            ],
+        ),
     ],
 )
 def test_extract_activities_with_position(markdown, expected):
@@ -178,6 +229,30 @@ def test_extract_stories_with_position(markdown, expected):
     assert actual == expected
 
 
+def test_story_table():
+    parser = MarkdownParser(
+        markdown="Story0\n## Task1\nStory1\nStory1\n---\nStory2!\n## Task2\nStory3 #a6dfb5"
+    )
+    table = parser.story_table()
+
+    assert table.strings == ["Story1", "Story2", "Story3", "#a6dfb5"]
+    assert list(table.texts) == [0, 0, 1, 2]
+    assert list(table.flags) == [
+        StoryFlag.DEFAULT,
+        StoryFlag.DEFAULT,
+        StoryFlag.WARNING,
+        StoryFlag.COLOR,
+    ]
+    assert list(table.colors) == [-1, -1, -1, 3]
+
+    layout = table.layout()
+    expected = parser.extract_stories_with_position()
+    assert list(layout.x) == [x["x"] for x in expected]
+    assert list(layout.y) == [x["y"] for x in expected]
+
+    assert len(parser.story_table(parser.task_ranges()[1])) == 1
+
+
 @pytest.mark.parametrize(
     "markdown, expected",
     [
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+import io
+import re
+
+import pytest
+from markdownusm import cli
+from markdownusm.converter import Converter
+from markdownusm.parser import MarkdownParser
+from markdownusm.reader import (
+    markdown_lines,
+    read_chunks,
+    split_lines,
+    stream_chunks,
+    strip_comments,
+)
+
+
+def chunked(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "a<!-- b -->c",
+        "a<!--\nb\n-->c\n<!-- d -->",
+        "<!-- a --><!-- b -->-->",
+        "<!--->a-->b",
+        "a<!-- unterminated\nb",
+        "a <!- b -- c ->",
+    ],
+)
+@pytest.mark.parametrize("size", [1, 2, 3, 100])
+def test_strip_comments(text, size):
+    expected = re.sub(r"<!--[\s\S]*?-->", "", text)
+
+    assert "".join(strip_comments(chunked(text, size))) == expected
+
+
+def test_split_lines():
+    assert list(split_lines(["a\nb", "c\n", "\nd"])) == ["a", "bc", "", "d"]
+
+
+def test_markdown_lines():
+    markdown = "# Activity\n<!--\n## Hidden\n-->\n\n## Task\n<!-- a\nStory"
+
+    assert (
+        list(markdown_lines(chunked(markdown, 4)))
+        == MarkdownParser(markdown=markdown).lines
+    )
+
+
+def test_read_chunks(tmp_path):
+    path = tmp_path / "a.md"
+    path.write_text("# 活動\n## タスク\nストーリー", encoding="utf-8")
+
+    # Characters of 3 bytes split between chunks
+    assert "".join(read_chunks(path, encoding="utf-8", size=2)) == path.read_text(
+        encoding="utf-8"
+    )
+
+    path.write_bytes(b"")
+    assert "".join(read_chunks(path)) == ""
+
+
+def test_convert_chunks(tmp_path):
+    markdown = "- Release\n# Activity\n## Task\n<!-- Story -->\nStory\n---\nStory"
+    path = tmp_path / "a.md"
+    path.write_text(markdown)
+
+    converter = Converter()
+    expected = converter.convert(markdown)
+
+    for chunks in [read_chunks(path, size=5), stream_chunks(io.StringIO(markdown))]:
+        fp = io.StringIO()
+        converter.convert_chunks(chunks, fp)
+
+        assert fp.getvalue() == expected
+
+
+def test_read_chunks_crlf(tmp_path):
+    path = tmp_path / "a.md"
+    path.write_bytes(b"- Release\r\n# A\r\n## T\r\nStory!\r\n---\rStory\r\n")
+
+    assert "".join(read_chunks(path, size=1)) == path.read_text()
+
+    # Streamed output is the same as cached output, which reads the whole text
+    fp = io.StringIO()
+    cli.convert_path(path, fp)
+    assert fp.getvalue() == cli.parse(path.read_text())
+    assert "\r" not in fp.getvalue()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+import io
+
+import pytest
+from markdownusm import reverse as reverse_module
+from markdownusm.converter import Converter
+from markdownusm.reverse import read_cells, reverse
+
+MARKDOWN = """- Release1
+- Release2
+
+# Activity1
+## Task1
+Story1
+Story2!
+---
+Story3 #ff0000
+## Task2
+---
+Story4
+# Activity2
+## タスク3
+ストーリー5
+"""
+
+
+def dio(converter, markdown=MARKDOWN):
+    return io.BytesIO(converter.convert(markdown).strip().encode())
+
+
+@pytest.mark.parametrize(
+    "converter",
+    [Converter(), Converter(minify=True), Converter(compress=True)],
+    ids=["xml", "minify", "compress"],
+)
+def test_reverse(converter):
+    markdown = "\n".join(reverse(dio(converter)))
+
+    assert converter.convert(markdown) == converter.convert(MARKDOWN)
+
+
+@pytest.mark.parametrize(
+    "markdown",
+    ["- R1\n- R2\n# A\n## T\nS1\n---", "- R1\n- R2\n- R3\n## T1\nS1\n## T2\nS2"],
+)
+def test_reverse_empty_releases(markdown):
+    converter = Converter()
+    actual = "\n".join(reverse(dio(converter, markdown)))
+
+    assert converter.convert(actual) == converter.convert(markdown)
+
+
+def test_reverse_settings():
+    converter = Converter(padding=50, width=200)
+    markdown = "\n".join(reverse(dio(converter), settings=converter))
+
+    assert converter.convert(markdown) == converter.convert(MARKDOWN)
+
+
+def test_decompress_in_chunks(monkeypatch):
+    # Escape sequences of multibyte characters are split between chunks
+    monkeypatch.setattr(reverse_module, "CHUNK_SIZE", 4)
+
+    cells = read_cells(dio(Converter(compress=True)))
+
+    assert cells.tasks[2] == "タスク3"
+    assert (2, 2, "ストーリー5") in cells.stories
+
+
+def test_moved_cell():
+    xml = Converter().convert(MARKDOWN)
+    # Story1 dragged a little to the right and down
+    xml = xml.replace('x="290.0" y="210.0"', 'x="300.0" y="215.0"')
+
+    cells = read_cells(io.BytesIO(xml.strip().encode()))
+
+    assert (0, 2, "Story1") in cells.stories
+
+
+def test_unknown_cell():
+    xml = (
+        Converter()
+        .convert(MARKDOWN)
+        .replace(
+            "<root>",
+            '<root><mxCell value="note" style="fontColor=#000000" vertex="1">'
+            '<mxGeometry x="0" y="0" as="geometry"/></mxCell>',
+        )
+    )
+
+    assert "note" not in list(reverse(io.BytesIO(xml.strip().encode())))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from markdownusm.cli import parse
+from markdownusm.server import LRU, ConversionServer
+
+
+async def request(port, method, path, body=b"", length=None):
+    length = len(body) if length is None else length
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Length: {length}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+    response = await reader.read()
+    writer.close()
+
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), payload.decode()
+
+
+def serve(executor, *requests, **kwargs):
+    async def run():
+        server = ConversionServer(port=0, executor=executor, **kwargs)
+        await server.start()
+
+        try:
+            return await asyncio.gather(*(request(server.port, *x) for x in requests))
+        finally:
+            await server.close()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def markdown():
+    return "- Release\n# Activity\n## Task\nStory"
+
+
+@pytest.mark.parametrize(
+    "executor", [None, ThreadPoolExecutor(2)], ids=["process", "thread"]
+)
+def test_convert(executor, markdown):
+    responses = serve(
+        executor,
+        *[("POST", "/convert", markdown.encode())] * 3,
+        concurrency=1,
+    )
+
+    assert responses == [(200, parse(markdown))] * 3
+
+
+def test_errors():
+    responses = serve(
+        ThreadPoolExecutor(1),
+        ("GET", "/health"),
+        ("GET", "/convert"),
+        ("GET", "/unknown"),
+        ("POST", "/convert", b"x" * 11),
+        ("POST", "/convert", b"", -1),
+        max_body=10,
+    )
+
+    assert [x[0] for x in responses] == [200, 405, 404, 413, 400]
+
+
+def test_lru():
+    lru = LRU(2)
+    lru.set(b"a", "A")
+    lru.set(b"b", "B")
+    lru.get(b"a")
+    lru.set(b"c", "C")
+
+    assert [lru.get(x) for x in [b"a", b"b", b"c"]] == ["A", None, "C"]
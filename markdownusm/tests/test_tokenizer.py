@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+import pytest
+from markdownusm.tokenizer import LineKind, classify, tokenize
+
+
+@pytest.mark.parametrize(
+    "line, kind, text",
+    [
+        ("- Release 1", LineKind.RELEASE, "Release 1"),
+        ("# Activity 1", LineKind.ACTIVITY, "Activity 1"),
+        ("## Task 1", LineKind.TASK, "Task 1"),
+        ("---", LineKind.SEPARATOR, "---"),
+        ("--- <!-- -->", LineKind.SEPARATOR, "--- <!-- -->"),
+        ("Story 1", LineKind.STORY, "Story 1"),
+        ("#hashtag", LineKind.STORY, "#hashtag"),
+        ("-", LineKind.STORY, "-"),
+        # Prefixes in the middle of text are kept
+        ("## Task ## 1", LineKind.TASK, "Task ## 1"),
+        ("# Activity # 1", LineKind.ACTIVITY, "Activity # 1"),
+        ("- Release - 1", LineKind.RELEASE, "Release - 1"),
+        ("Story ## 1", LineKind.STORY, "Story ## 1"),
+    ],
+)
+def test_classify(line, kind, text):
+    actual, offset = classify(line)
+    assert (actual, line[offset:]) == (kind, text)
+
+
+def test_tokenize():
+    assert list(tokenize(["# A", "Story"])) == [
+        (LineKind.ACTIVITY, 2),
+        (LineKind.STORY, 0),
+    ]
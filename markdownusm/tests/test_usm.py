@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 
 import pytest
+from markdownusm.parser import MarkdownParser
 from markdownusm.usm import Usm
-from markdownusm.xml import Rectangle
+from markdownusm.xml import Rectangle, RectangleRecord
+from pydantic import ValidationError
 
 
 @pytest.mark.parametrize(
@@ -153,3 +155,30 @@ def test_set_story_properties_warning(source, expected):
 def test_to_stories(source, expected):
     actual = Usm(source=source).to_stories()
     assert actual == expected
+
+
+def test_iter_story_table():
+    parser = MarkdownParser(
+        markdown="## Task1\nStory1\n---\nStory2!\n## Task2\nStory3 #a6dfb5"
+    )
+    usm = Usm(source=[])
+
+    actual = list(usm.iter_story_table(parser.story_table()))
+    expected = Usm(source=parser.extract_stories_with_position()).to_stories()
+    assert actual == expected
+
+
+def test_strict():
+    source = [dict(text="Activity", x=-3, y=0)]
+
+    assert isinstance(Usm(source=source).to_activities()[0], RectangleRecord)
+    with pytest.raises(ValidationError):
+        Usm(source=source, strict=True).to_activities()
+
+
+def test_relayout():
+    usm = Usm(source=[dict(text="Activity", x=1, y=1)])
+    assert usm.to_activities()[0].x == 450.0
+
+    usm.padding = 40
+    assert (usm.to_activities()[0].x, usm.to_activities()[0].y) == (470.0, 150.0)
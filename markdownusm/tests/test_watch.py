@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+import io
+
+import pytest
+from markdownusm.converter import Converter
+from markdownusm.watch import IncrementalRenderer, watch
+
+
+def render(markdown):
+    return Converter().convert(markdown)
+
+
+@pytest.mark.parametrize(
+    "edited, rendered_columns",
+    [
+        # Story in the second column changed
+        ("- R\n# A\n## T1\nS1\n---\nS2\n## T2\nS3!\n---\nS4", 1),
+        # Activity renamed
+        ("- R\n# B\n## T1\nS1\n---\nS2\n## T2\nS3\n---\nS4", 0),
+        # First release grows so that every column shifts
+        ("- R\n# A\n## T1\nS1\nS1\n---\nS2\n## T2\nS3\n---\nS4", 2),
+    ],
+)
+def test_incremental_renderer(edited, rendered_columns):
+    renderer = IncrementalRenderer()
+    original = "- R\n# A\n## T1\nS1\n---\nS2\n## T2\nS3\n---\nS4"
+
+    assert renderer.render(original) == render(original)
+    assert renderer.rendered_columns == 2
+
+    assert renderer.render(edited) == render(edited)
+    assert renderer.rendered_columns == rendered_columns
+
+
+def test_watch(tmp_path):
+    source = tmp_path / "map.md"
+    source.write_text("# Activity\n## Task\nStory")
+    log = io.StringIO()
+
+    watch(source, tmp_path / "map.dio", interval=0, log=log, refreshes=1)
+
+    assert (tmp_path / "map.dio").read_text() == render(source.read_text())
+    assert "(1/1 columns)" in log.getvalue()
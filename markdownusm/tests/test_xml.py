@@ -1,6 +1,20 @@
 #!/usr/bin/env python
 
-from markdownusm.xml import Line, Rectangle
+import io
+import xml.etree.ElementTree as ET
+
+from markdownusm.xml import (
+    Line,
+    LineRecord,
+    Rectangle,
+    RectangleRecord,
+    XMLObjects,
+    compile_template,
+    deflate,
+    inflate,
+    minify,
+    rectangle_style,
+)
 
 
 def test_rectangle():
@@ -19,8 +33,93 @@ def test_lint():
     assert actual == expected
 
 
+def test_style_cache():
+    kwargs = dict(text="test", x=0, y=0, fillColor="#000000", fontColor="#000000")
+    rectangle_style.cache_clear()
+
+    styles = [RectangleRecord(**kwargs)._style() for _ in range(3)]
+    float_style = RectangleRecord(**kwargs, spacingLeft=5.0)._style()
+
+    assert rectangle_style.cache_info().hits == 2
+    assert styles[0] is styles[2]
+    assert "spacingLeft=5;" in styles[0] and "spacingLeft=5.0;" in float_style
+
+
 def test__geometry():
     expected = 'x="0.0" y="0.0" width="140" height="60"'
     actual = Rectangle(text="", x=0, y=0, fillColor="", fontColor="")._geometry()
 
     assert actual == expected
+
+
+def test_record_to_xml():
+    kwargs = dict(text="test", x=0.0, y=0.0, fillColor="#000000", fontColor="#000000")
+
+    assert RectangleRecord(**kwargs).to_xml() == Rectangle(**kwargs).to_xml()
+    assert RectangleRecord(**kwargs) == Rectangle(**kwargs)
+    assert (
+        LineRecord(x=0.0, y=0.0, width=1.0).to_xml()
+        == Line(x=0.0, y=0.0, width=1.0).to_xml()
+    )
+
+
+def test_write():
+    shapes = [Rectangle(text="test", x=0, y=0, fillColor="", fontColor="")]
+    fp = io.StringIO()
+    XMLObjects().write(fp, shapes=iter(shapes))
+
+    assert fp.getvalue() == XMLObjects(shapes=shapes).render()
+
+
+def test_compile_template():
+    source = XMLObjects().xml_template
+
+    assert compile_template(source) is compile_template(source)
+
+
+def test_minify():
+    shapes = [
+        Rectangle(text="a  b", x=0, y=0, fillColor="", fontColor=""),
+        Line(x=0, y=0, width=1),
+    ]
+    minified = XMLObjects(shapes=shapes, minify=True).render()
+
+    assert minified == minify(XMLObjects(shapes=shapes).render())
+    assert minified.startswith("<mxfile><diagram><mxGraphModel ")
+    assert 'value="a  b"' in minified
+
+
+def test_compress():
+    shapes = [Rectangle(text="日本", x=0, y=0, fillColor="", fontColor="")]
+    compressed = XMLObjects(shapes=shapes, compress=True).render()
+    diagram = compressed[len("<mxfile><diagram>") : -len("</diagram></mxfile>")]
+
+    assert compressed.endswith("</diagram></mxfile>")
+    assert "<mxfile><diagram>" + inflate(diagram) + "</diagram></mxfile>" == (
+        XMLObjects(shapes=shapes, minify=True).render()
+    )
+
+
+def test_deflate():
+    pieces = ["<a>", "text with spaces & (marks)!", "</a>"] * 100
+
+    assert "".join(deflate(pieces)) == "".join(deflate(["".join(pieces)]))
+    assert inflate("".join(deflate(pieces))) == "".join(pieces)
+
+
+def test_generate_pages():
+    shapes = [Rectangle(text="test", x=0, y=0, fillColor="", fontColor="")]
+    cells = [x.to_xml() for x in shapes]
+    xml_objects = XMLObjects()
+
+    pages = [
+        "".join(xml_objects.generate_diagram(cells, name)) for name in ["a", "<b>"]
+    ]
+    document = "".join(xml_objects.generate_pages(pages))
+
+    assert [x.get("name") for x in ET.fromstring(document.strip())] == ["a", "<b>"]
+    # A page has the same graph model as a document with a single page
+    single = minify(XMLObjects(shapes=shapes).render())
+    assert minify(pages[0]) == single.replace(
+        "<mxfile><diagram>", '<diagram name="a">'
+    ).replace("</mxfile>", "")
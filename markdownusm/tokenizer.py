@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""Classify markdown lines of a story map by their prefixes
+
+Lines are dispatched on their first character, so that stories, most of the
+lines, are told apart by one dictionary lookup. The prefix is not removed:
+its length is returned instead, and the text is `line[offset:]`.
+
+Examples:
+    >>> list(tokenize(["# Activity", "## Task", "Story ## 1"]))
+    [(<LineKind.ACTIVITY: 1>, 2), (<LineKind.TASK: 2>, 3), (<LineKind.STORY: 4>, 0)]
+
+"""
+
+from enum import IntEnum
+from typing import Iterable, Iterator
+
+
+class LineKind(IntEnum):
+    """Kind of a markdown line"""
+
+    RELEASE = 0
+    ACTIVITY = 1
+    TASK = 2
+    SEPARATOR = 3
+    STORY = 4
+
+
+# Kind of a line and the length of its prefix
+Token = tuple[LineKind, int]
+
+# Prefixes by their first character, longest first, and the offset of the
+# text after each of them. Separators keep their whole line as text.
+RULES: dict[str, tuple[tuple[str, Token], ...]] = {
+    "#": (("## ", (LineKind.TASK, 3)), ("# ", (LineKind.ACTIVITY, 2))),
+    "-": (("- ", (LineKind.RELEASE, 2)), ("---", (LineKind.SEPARATOR, 0))),
+}
+
+STORY: Token = (LineKind.STORY, 0)
+
+
+def classify(line: str) -> Token:
+    """Identify kind of a line and the offset of its text
+
+    Examples:
+        >>> classify("## Task1")
+        (<LineKind.TASK: 2>, 3)
+
+    """
+    for prefix, token in RULES.get(line[:1], ()):
+        if line.startswith(prefix):
+            return token
+
+    return STORY
+
+
+def tokenize(lines: Iterable[str]) -> Iterator[Token]:
+    """Classify lines one by one, lines without blanks and comments"""
+    return map(classify, lines)
@@ -1,19 +1,26 @@
 #!/usr/bin/env python
 """Convert list objects to XML objects"""
 
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, PrivateAttr
 
-from markdownusm.xml import Line, Rectangle
+from markdownusm.layout import Layout
+from markdownusm.parser import StoryFlag, StoryTable, split_story
+from markdownusm.xml import (
+    Line,
+    LineRecord,
+    LineXML,
+    Rectangle,
+    RectangleRecord,
+    RectangleXML,
+)
 
 U = Union[str, float]
 
 
-class Usm(BaseModel):
-    source: list[dict[str, U]]
-    # Source list with absolute position
-    source_abs: Optional[list[dict[str, U]]]
+class UsmSettings(BaseModel):
+    """Layout and color settings of shapes"""
 
     start_x: float = 290
     start_y: float = 50
@@ -39,71 +46,172 @@ class Usm(BaseModel):
     story_default_fill_color: str = "#ebf4fa"
     story_warning_fill_color: str = "#f8d7da"
 
+    strict: bool = Field(False, title="Validate every shape with pydantic")
+
+
+class Usm(UsmSettings):
+    source: list[dict[str, U]]
+
+    # Relative positions, populated by constructor
+    _layout: Layout = PrivateAttr()
+    # Absolute positions with the settings they were computed from
+    _layout_abs: Optional[tuple[tuple[float, ...], Layout]] = PrivateAttr(None)
+
     def __init__(self, **data):
         super().__init__(**data)
 
-        self.source_abs = [self._update_dic(dic) for dic in self.source]
+        self._layout = Layout.from_source(self.source)
 
-    def to_activities(self) -> list[Rectangle]:
-        colors = dict(
-            fillColor=self.activity_fill_color, fontColor=self.activity_font_color
-        )
+    @classmethod
+    def from_settings(cls, source: list[dict[str, U]], settings: UsmSettings) -> "Usm":
+        """Create without validating source and settings again
+
+        Source must be created by `MarkdownParser` or be as valid as it
 
-        return [Rectangle(**(dic | colors)) for dic in self.source_abs]
+        """
+        usm = cls.construct(
+            source=source, **settings.dict(include=set(UsmSettings.__fields__))
+        )
+        usm._layout = Layout.from_source(source)
 
-    def to_tasks(self) -> list[Rectangle]:
-        colors = dict(fillColor=self.task_fill_color, fontColor=self.task_font_color)
+        return usm
 
-        return [Rectangle(**(dic | colors)) for dic in self.source_abs]
+    @property
+    def source_abs(self) -> list[dict[str, U]]:
+        """Source list with absolute position"""
+        layout = self._absolute_layout()
 
-    def to_stories(self) -> list[Rectangle]:
         return [
-            Rectangle(**(dic | self._set_story_properties(dic)))
-            for dic in self.source_abs
+            self._update_dic(dic, x, y, width)
+            for dic, x, y, width in zip(self.source, layout.x, layout.y, layout.width)
         ]
 
-    def to_release_texts(self) -> list[Rectangle]:
-        colors = dict(
+    def to_activities(self) -> list[RectangleXML]:
+        return list(self.iter_activities())
+
+    def to_tasks(self) -> list[RectangleXML]:
+        return list(self.iter_tasks())
+
+    def to_stories(self) -> list[RectangleXML]:
+        return list(self.iter_stories())
+
+    def to_release_texts(self) -> list[RectangleXML]:
+        return list(self.iter_release_texts())
+
+    def to_release_bars(self) -> list[LineXML]:
+        return list(self.iter_release_bars())
+
+    def iter_activities(self) -> Iterator[RectangleXML]:
+        return self._iter_rectangles(
+            fillColor=self.activity_fill_color, fontColor=self.activity_font_color
+        )
+
+    def iter_tasks(self) -> Iterator[RectangleXML]:
+        return self._iter_rectangles(
+            fillColor=self.task_fill_color, fontColor=self.task_font_color
+        )
+
+    def iter_stories(self) -> Iterator[RectangleXML]:
+        rectangle = Rectangle if self.strict else RectangleRecord
+        layout = self._absolute_layout()
+
+        for dic, x, y in zip(self.source, layout.x, layout.y):
+            text, fill_color = self._story_text_and_fill_color(str(dic["text"]))
+            yield rectangle(
+                text=text,
+                x=x,
+                y=y,
+                fillColor=fill_color,
+                fontColor=self.story_font_color,
+            )
+
+    def iter_story_table(self, table: StoryTable) -> Iterator[RectangleXML]:
+        """Create stories of a table, the same as `iter_stories` of its source"""
+        rectangle = Rectangle if self.strict else RectangleRecord
+        layout = self._transform(table.layout())
+        strings = table.strings
+        fill_colors = {
+            StoryFlag.DEFAULT: self.story_default_fill_color,
+            StoryFlag.WARNING: self.story_warning_fill_color,
+        }
+
+        for text, flag, color, x, y in zip(
+            table.texts, table.flags, table.colors, layout.x, layout.y
+        ):
+            yield rectangle(
+                text=strings[text],
+                x=x,
+                y=y,
+                fillColor=strings[color] if color >= 0 else fill_colors[flag],
+                fontColor=self.story_font_color,
+            )
+
+    def iter_release_texts(self) -> Iterator[RectangleXML]:
+        return self._iter_rectangles(
             fillColor=self.release_text_fill_color,
             fontColor=self.release_text_font_color,
             strokeColor=self.release_text_stroke_color,
         )
 
-        return [Rectangle(**(dic | colors)) for dic in self.source_abs]
+    def iter_release_bars(self) -> Iterator[LineXML]:
+        line = Line if self.strict else LineRecord
+        layout = self._absolute_layout()
 
-    def to_release_bars(self) -> list[Line]:
-        colors = dict(strokeColor=self.release_bar_stroke_color, shadow=1)
+        return (
+            line(x=x, y=y, width=width, strokeColor=self.release_bar_stroke_color)
+            for x, y, width in zip(layout.x, layout.y, layout.width)
+        )
 
-        return [Line(**dic | colors) for dic in self.source_abs]
+    def _iter_rectangles(self, **colors: str) -> Iterator[RectangleXML]:
+        """Create rectangles sharing colors one by one
 
-    def _relative_to_absolute_vertical(self, y: float) -> float:
-        """Convert relative vertical position to absolute position"""
-        return self.start_y + (self.height + self.padding) * y
+        Shapes are validated by pydantic only in strict mode
 
-    def _relative_to_absolute_horizontal(self, x: float) -> float:
-        """Convert relative horizontal position to absolute position"""
-        return self.start_x + (self.width + self.padding) * x
+        """
+        rectangle = Rectangle if self.strict else RectangleRecord
+        layout = self._absolute_layout()
 
-    def _relative_to_absolute_width(self, width: float) -> float:
-        """Convert relative width to absolute width"""
-        return self.start_x + (self.width + self.padding) * width
+        return (
+            rectangle(text=dic["text"], x=x, y=y, **colors)
+            for dic, x, y in zip(self.source, layout.x, layout.y)
+        )
 
-    def _update_dic(self, dic: dict[str, U]) -> dict[str, U]:
-        """Update dictonary to convert positions
+    def _absolute_layout(self) -> Layout:
+        """Convert relative positions of all shapes to absolute positions
 
-        Called from constructor
+        The result is reused until layout settings change
 
         """
+        settings = (self.start_x, self.start_y, self.width, self.height, self.padding)
+
+        if self._layout_abs is None or self._layout_abs[0] != settings:
+            self._layout_abs = (settings, self._transform(self._layout))
+
+        return self._layout_abs[1]
+
+    def _transform(self, layout: Layout) -> Layout:
+        return layout.transform(
+            start_x=self.start_x,
+            start_y=self.start_y,
+            step_x=self.width + self.padding,
+            step_y=self.height + self.padding,
+        )
+
+    @staticmethod
+    def _update_dic(
+        dic: dict[str, U], x: float, y: float, width: float
+    ) -> dict[str, U]:
+        """Update dictonary with absolute positions"""
         result = dic.copy()
 
-        if (x := result.get("x")) is not None:
-            result = result | dict(x=self._relative_to_absolute_horizontal(float(x)))
+        if "x" in result:
+            result["x"] = x
 
-        if (y := result.get("y")) is not None:
-            result = result | dict(y=self._relative_to_absolute_vertical(float(y)))
+        if "y" in result:
+            result["y"] = y
 
-        if (width := result.get("width")) is not None:
-            result = result | dict(width=self._relative_to_absolute_width(float(width)))
+        if "width" in result:
+            result["width"] = width
 
         return result
 
@@ -120,23 +228,28 @@ class Usm(BaseModel):
             dict(text="Story X", fillColor="#ebf4fa", ...)
 
         """
-        result: dict[str, U] = source_dic.copy()
+        text, fill_color = self._story_text_and_fill_color(str(source_dic.get("text")))
 
-        update_dic = dict(
-            fontColor=self.story_font_color, fillColor=self.story_default_fill_color
+        return source_dic | dict(
+            text=text, fontColor=self.story_font_color, fillColor=fill_color
         )
-        story_text = str(result.get("text"))
 
-        if story_text[-1] == "!":
-            # If story's suffix is `!`
-            update_dic = update_dic | dict(
-                text=story_text[:-1], fillColor=self.story_warning_fill_color
-            )
-        elif "#" in story_text:
-            # If story has hex color code in suffix
-            update_dic = update_dic | dict(
-                text=story_text.split("#")[0].strip(),
-                fillColor="#" + story_text.split("#")[1].strip(),
-            )
+    def _story_text_and_fill_color(self, story_text: str) -> tuple[str, str]:
+        """Split story text into text and fill color
+
+        Examples:
+            >>> _story_text_and_fill_color("Story X!")
+            ("Story X", "#f8d7da")
+
+            >>> _story_text_and_fill_color("Story X #000000")
+            ("Story X", "#000000")
+
+        """
+        text, flag, color = split_story(story_text)
+
+        if flag == StoryFlag.WARNING:
+            return text, self.story_warning_fill_color
+        if flag == StoryFlag.COLOR:
+            return text, color
 
-        return result | update_dic
+        return text, self.story_default_fill_color
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""Render markdown again whenever it changes"""
+
+import sys
+import time
+from itertools import chain
+from pathlib import Path
+from typing import Optional, TextIO
+
+from markdownusm.cache import write_atomic
+from markdownusm.converter import Converter, Sources
+from markdownusm.parser import MarkdownParser
+
+
+class IncrementalRenderer:
+    """Render markdown reusing XML of task columns rendered last time
+
+    A column is reused when its lines, its position and the height of every
+    release are unchanged. Activities, tasks and releases are always
+    rendered again since there are few of them.
+
+    """
+
+    def __init__(self, converter: Optional[Converter] = None):
+        self.converter = Converter() if converter is None else converter
+
+        # XML of stories in each column keyed by column, heights and lines
+        self._stories: dict[tuple[int, tuple[int, ...], str], list[str]] = {}
+
+        # Statistics of the last render
+        self.rendered_columns = 0
+        self.total_columns = 0
+
+    def render(self, markdown: str) -> str:
+        parser = MarkdownParser(markdown=markdown)
+        converter = self.converter
+        heights = parser.release_index().heights
+
+        stories: dict[tuple[int, tuple[int, ...], str], list[str]] = {}
+        self.rendered_columns = 0
+
+        for column, lines in enumerate(parser.task_ranges()):
+            text = "\n".join(parser.lines[lines.start : lines.stop])
+            key = (column, heights, text)
+
+            if (xml := self._stories.get(key)) is None:
+                table = parser.story_table(lines)
+                xml = list(converter.cells(Sources(stories=table)))
+                self.rendered_columns += 1
+
+            stories[key] = xml
+
+        # Columns not in this version are dropped
+        self._stories = stories
+        self.total_columns = len(stories)
+
+        cells = converter.cells_around(parser, chain.from_iterable(stories.values()))
+
+        return "".join(converter.xml_objects().generate_xml(cells))
+
+
+def watch(
+    source: Path,
+    destination: Path,
+    interval: float = 0.5,
+    log: TextIO = sys.stderr,
+    refreshes: Optional[int] = None,
+    converter: Optional[Converter] = None,
+) -> None:
+    """Poll a markdown file and write XML whenever it changes
+
+    Args:
+        interval: Seconds between polls
+        log: Stream for timing of each refresh
+        refreshes: Number of refreshes to stop after, forever when None
+        converter: Settings and output format, defaults when None
+
+    """
+    renderer = IncrementalRenderer(converter)
+    last: Optional[tuple[int, int]] = None
+
+    while refreshes is None or refreshes > 0:
+        try:
+            stat = source.stat()
+            signature: Optional[tuple[int, int]] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+
+        if signature is not None and signature != last:
+            last = signature
+            start = time.perf_counter()
+
+            try:
+                markdown = source.read_text(
+                    encoding=sys.getdefaultencoding(), errors="ignore"
+                )
+                write_atomic(destination, renderer.render(markdown))
+            except Exception as e:
+                print(f"failed {source}: {type(e).__name__}: {e}", file=log)
+            else:
+                elapsed = (time.perf_counter() - start) * 1000
+                print(
+                    f"rendered {source} -> {destination} in {elapsed:.1f} ms "
+                    f"({renderer.rendered_columns}/{renderer.total_columns} columns)",
+                    file=log,
+                    flush=True,
+                )
+
+            if refreshes is not None:
+                refreshes -= 1
+                continue
+
+        time.sleep(interval)
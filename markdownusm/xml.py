@@ -1,13 +1,119 @@
 #!/usr/bin/env python
 
+import base64
+import re
+import zlib
 from abc import ABCMeta, abstractmethod
-from typing import Union
+from functools import lru_cache
+from html import escape
+from itertools import chain
+from typing import Iterable, Iterator, Optional, TextIO, Union
+from urllib.parse import quote, unquote
 
-from jinja2 import BaseLoader, Environment
+from jinja2 import BaseLoader, Environment, Template
 from pydantic import BaseModel, Field
 
 U = Union[str, float]
 
+# Kind of shape and its place: column or index, release and row
+Key = tuple[str, int, int, int]
+
+environment = Environment(loader=BaseLoader())
+
+
+@lru_cache(maxsize=16)
+def compile_template(source: str) -> Template:
+    """Compile a template once per process for each source"""
+    return environment.from_string(source)
+
+
+# Whitespace between tags, which draw.io ignores
+_INDENT = re.compile(r">\s+<")
+
+# Characters left as they are by `encodeURIComponent` of JavaScript
+_URI_SAFE = "!'()*"
+
+# Attributes of the graph model of every diagram
+_GRAPH_MODEL_ATTRIBUTES = (
+    'dx="661" dy="316" grid="0" gridSize="10" guides="1" tooltips="1" '
+    'connect="1" arrows="1" fold="1" page="1" pageScale="1" pageWidth="827" '
+    'pageHeight="1169" math="0" shadow="0" background="#FFFFFF"'
+)
+
+# Graph model of a diagram in XML templates
+_GRAPH_MODEL_TEMPLATE = (
+    f"<mxGraphModel {_GRAPH_MODEL_ATTRIBUTES}>"
+    """
+                <root>
+                    <mxCell id="0"/>
+                    <mxCell id="1" parent="0"/>
+                    {% for item in shapes %}
+                    {{ item }}
+                    {% endfor %}
+                </root>
+            </mxGraphModel>"""
+)
+
+
+def minify(xml: str) -> str:
+    """Drop whitespace around and between tags
+
+    Examples:
+        >>> minify("\n  <a>\n    <b/>\n  </a>\n")
+        '<a><b/></a>'
+
+    """
+    return _INDENT.sub("><", xml.strip())
+
+
+def deflate(pieces: Iterable[str]) -> Iterator[str]:
+    """Encode XML into a compressed diagram of draw.io piece by piece
+
+    XML is URI encoded, compressed by raw deflate and encoded by base64, so
+    that the whole document is never held in memory
+
+    """
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    rest = b""
+
+    for piece in pieces:
+        rest += compressor.compress(quote(piece, safe=_URI_SAFE).encode("ascii"))
+
+        # base64 encodes 3 bytes at a time
+        size = len(rest) - len(rest) % 3
+        if size:
+            yield base64.b64encode(rest[:size]).decode("ascii")
+            rest = rest[size:]
+
+    yield base64.b64encode(rest + compressor.flush()).decode("ascii")
+
+
+def inflate(diagram: str) -> str:
+    """Decode a compressed diagram of draw.io into XML"""
+    data = zlib.decompress(base64.b64decode(diagram), -zlib.MAX_WBITS)
+    return unquote(data.decode("ascii"))
+
+
+def cell_id(key: Key, xml: str) -> str:
+    """Id of a cell from its place and a hash of its XML without id
+
+    The same cell gets the same id every time it is converted, and a cell
+    whose text, style or geometry changed keeps the part before the hash
+
+    Examples:
+        >>> cell_id(("story", 2, 1, 0), shape.to_xml())
+        'story-2-1-0-5f3a09c1'
+
+    """
+    kind, column, release, row = key
+
+    return f"{kind}-{column}-{release}-{row}-{zlib.crc32(xml.encode()):08x}"
+
+
+def with_id(xml: str, id: str) -> str:
+    """Give `id` to the `<mxCell>` converted by `to_xml`"""
+    return xml.replace("<mxCell ", f'<mxCell id="{id}" ', 1)
+
 
 class XMLObject(BaseModel, metaclass=ABCMeta):
     @abstractmethod
@@ -15,7 +121,136 @@ class XMLObject(BaseModel, metaclass=ABCMeta):
         pass
 
 
-class Rectangle(XMLObject):
+class ShapeRecord:
+    """Base of plain shape records which skip pydantic validation
+
+    Records compare equal to their pydantic counterparts with the same values
+
+    """
+
+    __slots__: tuple[str, ...] = ()
+
+    def dict(self) -> dict[str, U]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (ShapeRecord, BaseModel)):
+            return self.dict() == other.dict()
+        if isinstance(other, dict):
+            return self.dict() == other
+
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in self.dict().items())
+        return f"{self.__class__.__name__}({fields})"
+
+
+@lru_cache(maxsize=4096, typed=True)
+def rectangle_style(
+    rounded: int,
+    whiteSpace: str,
+    fillColor: str,
+    strokeColor: str,
+    fontColor: str,
+    align: str,
+    verticalAlign: str,
+    spacingLeft: float,
+    spacingRight: float,
+    shadow: int,
+) -> str:
+    """Style of rectangles, built once for each combination of settings
+
+    Typed so that `5` and `5.0` keep their own text as before
+
+    Examples:
+        >>> rectangle_style(
+        ...     0, "wrap", "#000000", "none", "#ffffff", "left", "top", 5, 5, 1
+        ... )
+        'html=1;rounded=0;whiteSpace=wrap;fillColor=#000000;...;shadow=1'
+
+    """
+    return (
+        f"html=1;rounded={rounded};whiteSpace={whiteSpace};fillColor={fillColor};"
+        f"strokeColor={strokeColor};fontColor={fontColor};align={align};"
+        f"verticalAlign={verticalAlign};spacingLeft={spacingLeft};"
+        f"spacingRight={spacingRight};shadow={shadow}"
+    )
+
+
+@lru_cache(maxsize=256, typed=True)
+def line_style(strokeWidth: float, strokeColor: str) -> str:
+    """Style of lines, built once for each combination of settings"""
+    return (
+        f"html=1;endArrow=none;shadow=0;strokeWidth={strokeWidth};"
+        f"strokeColor={strokeColor}"
+    )
+
+
+class RectangleXML:
+    """XML rendering of rectangles
+
+    Attributes are declared by `Rectangle` and `RectangleRecord`
+
+    """
+
+    __slots__ = ()
+
+    text: str
+    y: float
+    x: float
+    fillColor: str
+    fontColor: str
+    height: float
+    width: float
+    rounded: int
+    whiteSpace: str
+    strokeColor: str
+    align: str
+    verticalAlign: str
+    spacingLeft: float
+    spacingRight: float
+    shadow: int
+
+    def to_xml(self) -> str:
+        # Formatted directly rather than through `_geometry` for speed
+        return (
+            "\n        "
+            f'<mxCell value="{self.text}" style="{self._style()}" '
+            'parent="1" vertex="1">'
+            "\n            "
+            f'<mxGeometry x="{self.x}" y="{self.y}" '
+            f'width="{self.width}" height="{self.height}" as="geometry"/>'
+            "\n        </mxCell>\n        "
+        )
+
+    def _geometry(self) -> str:
+        """Position settings
+        
+        Examples:
+            >>> _geometry()
+            'x="0.0" y="0.0" width="140" height="60"'
+        """
+        dic = dict(x=self.x, y=self.y, width=self.width, height=self.height)
+        return " ".join([f'{k}="{str(v)}"' for k, v in dic.items()])
+
+    def _style(self) -> str:
+        """Style settings"""
+        return rectangle_style(
+            self.rounded,
+            self.whiteSpace,
+            self.fillColor,
+            self.strokeColor,
+            self.fontColor,
+            self.align,
+            self.verticalAlign,
+            self.spacingLeft,
+            self.spacingRight,
+            self.shadow,
+        )
+
+
+class Rectangle(RectangleXML, XMLObject):
     """XML Rectangle Object"""
 
     text: str = Field(title="Text")
@@ -41,63 +276,85 @@ class Rectangle(XMLObject):
     spacingRight: float = Field(5, title="Right Spacing")
     shadow: int = Field(1, title="Shadow", ge=0, le=1)
 
-    def to_xml(self) -> str:
-        return f"""
-        <mxCell value="{self.text}" style="{self._style()}" parent="1" vertex="1">
-            <mxGeometry {self._geometry()} as="geometry"/>
-        </mxCell>
-        """
 
-    def _geometry(self) -> str:
-        """Position settings
-        
-        Examples:
-            >>> _geometry()
-            'x="0.0" y="0.0" width="140" height="60"'
-        """
-        dic = dict(x=self.x, y=self.y, width=self.width, height=self.height)
-        return " ".join([f'{k}="{str(v)}"' for k, v in dic.items()])
+class RectangleRecord(RectangleXML, ShapeRecord):
+    """Rectangle without validation
 
-    def _style(self) -> str:
-        """Style settings"""
-        dic = dict(
-            html=1,
-            rounded=self.rounded,
-            whiteSpace=self.whiteSpace,
-            fillColor=self.fillColor,
-            strokeColor=self.strokeColor,
-            fontColor=self.fontColor,
-            align=self.align,
-            verticalAlign=self.verticalAlign,
-            spacingLeft=self.spacingLeft,
-            spacingRight=self.spacingRight,
-            shadow=self.shadow,
-        )
+    Defaults are the same as `Rectangle`
 
-        return ";".join([f"{k}={v}" for k, v in dic.items()])
+    """
 
+    __slots__ = (
+        "text",
+        "y",
+        "x",
+        "fillColor",
+        "fontColor",
+        "height",
+        "width",
+        "rounded",
+        "whiteSpace",
+        "strokeColor",
+        "align",
+        "verticalAlign",
+        "spacingLeft",
+        "spacingRight",
+        "shadow",
+    )
+
+    def __init__(
+        self,
+        text: str,
+        x: float,
+        y: float,
+        fillColor: str,
+        fontColor: str,
+        height: float = 60,
+        width: float = 140,
+        rounded: int = 0,
+        whiteSpace: str = "wrap",
+        strokeColor: str = "none",
+        align: str = "left",
+        verticalAlign: str = "top",
+        spacingLeft: float = 5,
+        spacingRight: float = 5,
+        shadow: int = 1,
+    ):
+        self.text = text
+        self.y = y
+        self.x = x
+        self.fillColor = fillColor
+        self.fontColor = fontColor
+        self.height = height
+        self.width = width
+        self.rounded = rounded
+        self.whiteSpace = whiteSpace
+        self.strokeColor = strokeColor
+        self.align = align
+        self.verticalAlign = verticalAlign
+        self.spacingLeft = spacingLeft
+        self.spacingRight = spacingRight
+        self.shadow = shadow
+
+
+class LineXML:
+    """XML rendering of lines
+
+    Attributes are declared by `Line` and `LineRecord`
 
-class Line(XMLObject):
-    """XML Line Object"""
+    """
 
-    y: float = Field(title="Start/End vertical position")
-    x: float = Field(title="Start horizontal positon")
-    width: float = Field(title="Line length")
+    __slots__ = ()
 
-    strokeColor: str = Field("#000000")
-    strokeWidth: float = Field(2)
+    y: float
+    x: float
+    width: float
+    strokeColor: str
+    strokeWidth: float
 
     def _style(self) -> str:
         """Style settings"""
-        dic = dict(
-            html=1,
-            endArrow="none",
-            shadow=0,
-            strokeWidth=self.strokeWidth,
-            strokeColor=self.strokeColor,
-        )
-
-        return ";".join([f"{k}={v}" for k, v in dic.items()])
+        return line_style(self.strokeWidth, self.strokeColor)
 
     def to_xml(self) -> str:
         return f"""
@@ -110,26 +367,88 @@ class Line(XMLObject):
         """
 
 
+class Line(LineXML, XMLObject):
+    """XML Line Object"""
+
+    y: float = Field(title="Start/End vertical position")
+    x: float = Field(title="Start horizontal positon")
+    width: float = Field(title="Line length")
+
+    strokeColor: str = Field("#000000")
+    strokeWidth: float = Field(2)
+
+
+class LineRecord(LineXML, ShapeRecord):
+    """Line without validation
+
+    Defaults are the same as `Line`
+
+    """
+
+    __slots__ = ("y", "x", "width", "strokeColor", "strokeWidth")
+
+    def __init__(
+        self,
+        x: float,
+        y: float,
+        width: float,
+        strokeColor: str = "#000000",
+        strokeWidth: float = 2,
+    ):
+        self.y = y
+        self.x = x
+        self.width = width
+        self.strokeColor = strokeColor
+        self.strokeWidth = strokeWidth
+
+
+# Rectangles and lines, validated by pydantic or not
+Shape = Union[RectangleXML, LineXML]
+
+
 class XMLObjects(BaseModel):
-    """Merge XML objects into one XML document"""
+    """Merge XML objects into one XML document
+
+    With `minify` whitespace between tags is dropped, and with `compress`
+    the diagram is compressed the way draw.io saves it
+
+    """
 
-    shapes: list[XMLObject] = Field(title="XML Objects")
+    shapes: list[Shape] = Field(default_factory=list, title="XML Objects")
 
-    xml_template = """
+    minify: bool = Field(False, title="Drop whitespace between tags")
+    compress: bool = Field(False, title="Compress diagram by deflate and base64")
+
+    xml_template = (
+        """
     <mxfile>
         <diagram>
-            <mxGraphModel dx="661" dy="316" grid="0" gridSize="10" guides="1" tooltips="1" connect="1" arrows="1" fold="1" page="1" pageScale="1" pageWidth="827" pageHeight="1169" math="0" shadow="0" background="#FFFFFF">
-                <root>
-                    <mxCell id="0"/>
-                    <mxCell id="1" parent="0"/>
-                    {% for item in shapes %}
-                    {{ item }}
-                    {% endfor %}
-                </root>
-            </mxGraphModel>
+            """
+        + _GRAPH_MODEL_TEMPLATE
+        + """
         </diagram>
     </mxfile>
     """
+    )
+
+    # A page of a document with many pages
+    diagram_template = (
+        """
+        <diagram name="{{ name | e }}">
+            """
+        + _GRAPH_MODEL_TEMPLATE
+        + """
+        </diagram>"""
+    )
+
+    graph_model_template = (
+        f"<mxGraphModel {_GRAPH_MODEL_ATTRIBUTES}>"
+        '<root><mxCell id="0"/><mxCell id="1" parent="0"/>'
+        "{% for item in shapes %}{{ item }}{% endfor %}</root></mxGraphModel>"
+    )
+
+    class Config:
+        arbitrary_types_allowed = True
 
     def render(self) -> str:
         """Render XML objects
@@ -138,10 +457,71 @@ class XMLObjects(BaseModel):
             str: XML document
 
         """
-        template = Environment(loader=BaseLoader()).from_string(self.xml_template)
+        return "".join(self.generate())
+
+    def generate(self, shapes: Optional[Iterable[Shape]] = None) -> Iterator[str]:
+        """Render XML objects piece by piece
+
+        Shapes are converted to XML only when the document reaches them, so
+        `shapes` can be a generator producing them on demand
+
+        Args:
+            shapes: Shapes rendered instead of `self.shapes`
+
+        """
+        shapes = self.shapes if shapes is None else shapes
+
+        return self.generate_xml(x.to_xml() for x in shapes)
+
+    def generate_xml(self, cells: Iterable[str]) -> Iterator[str]:
+        """Render XML strings of shapes already converted by `to_xml`"""
+        if not (self.minify or self.compress):
+            return compile_template(self.xml_template).generate(shapes=cells)
+
+        return chain(
+            ["<mxfile><diagram>"], self._graph_model(cells), ["</diagram></mxfile>"]
+        )
+
+    def generate_diagram(self, cells: Iterable[str], name: str) -> Iterator[str]:
+        """Render XML strings of shapes into a `<diagram>` page named `name`
+
+        Pages are rendered independently and put together by `generate_pages`
+
+        """
+        if not (self.minify or self.compress):
+            template = compile_template(self.diagram_template)
+            return template.generate(shapes=cells, name=name)
+
+        return chain(
+            [f'<diagram name="{escape(name)}">'],
+            self._graph_model(cells),
+            ["</diagram>"],
+        )
+
+    def generate_pages(self, pages: Iterable[str]) -> Iterator[str]:
+        """Render one document with pages rendered by `generate_diagram`
+
+        Each page is written as soon as it is available, in order
+
+        """
+        if self.minify or self.compress:
+            yield "<mxfile>"
+            yield from pages
+            yield "</mxfile>"
+            return
+
+        yield "\n    <mxfile>"
+        yield from pages
+        yield "\n    </mxfile>\n    "
+
+    def _graph_model(self, cells: Iterable[str]) -> Iterator[str]:
+        """Minified `<mxGraphModel>`, compressed with `compress`"""
+        model = compile_template(self.graph_model_template).generate(
+            shapes=map(minify, cells)
+        )
 
-        return template.render(shapes=self._shapes_to_xml())
+        return deflate(model) if self.compress else model
 
-    def _shapes_to_xml(self) -> list[str]:
-        """Create XML string list"""
-        return [x.to_xml() for x in self.shapes]
+    def write(self, fp: TextIO, shapes: Optional[Iterable[Shape]] = None) -> None:
+        """Write XML document to a file-like object without building it in memory"""
+        fp.writelines(self.generate(shapes))
@@ -0,0 +1,7 @@
+#!/usr/bin/bash
+
+# Usage: scripts/bench.sh [previous results JSON to compare with]
+mkdir -p benchmarks/results
+output="benchmarks/results/$(git rev-parse --short HEAD).json"
+
+poetry run python benchmarks/bench_pipeline.py -o "$output" ${1:+-c "$1"}